@@ -0,0 +1,81 @@
+"""
+Sincronizar N todos: N chamadas POST/PATCH/DELETE /todos/{id} vs uma
+chamada em /todos/bulk.
+
+    python -m benchmarks.bench_bulk --items 200
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import app_client
+from fastapi_zero.models import User
+from fastapi_zero.security import create_access_token
+
+
+async def single(client, headers, items):
+    ids = []
+    for n in range(items):
+        response = await client.post(
+            '/todos/',
+            headers=headers,
+            json={'title': f'todo {n}', 'description': 'bench'},
+        )
+        ids.append(response.json()['id'])
+    for todo_id in ids:
+        await client.patch(
+            f'/todos/{todo_id}', headers=headers, json={'state': 'done'}
+        )
+    for todo_id in ids:
+        await client.delete(f'/todos/{todo_id}', headers=headers)
+
+
+async def bulk(client, headers, items):
+    response = await client.post(
+        '/todos/bulk',
+        headers=headers,
+        json=[
+            {'title': f'todo {n}', 'description': 'bench'}
+            for n in range(items)
+        ],
+    )
+    ids = [result['id'] for result in response.json()['results']]
+    await client.patch(
+        '/todos/bulk',
+        headers=headers,
+        json=[{'id': todo_id, 'state': 'done'} for todo_id in ids],
+    )
+    await client.request('DELETE', '/todos/bulk', headers=headers, json=ids)
+
+
+async def run(items: int):
+    async with app_client() as (client, engine):
+        async with engine.begin() as conn:
+            await conn.execute(
+                User.__table__.insert().values(
+                    username='bench', email='bench@example.com', password='x'
+                )
+            )
+        token = create_access_token({'sub': 'bench@example.com'})
+        headers = {'Authorization': f'Bearer {token}'}
+
+        for name, scenario in (('single', single), ('bulk', bulk)):
+            start = time.perf_counter()
+            await scenario(client, headers, items)
+            elapsed = time.perf_counter() - start
+            print(
+                f'{name:<7} items={items} create+update+delete '
+                f'{elapsed * 1000:.1f}ms'
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.items))
+
+
+if __name__ == '__main__':
+    main()
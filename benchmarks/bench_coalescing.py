@@ -0,0 +1,103 @@
+"""
+Rajadas de GET /todos/ idênticos do mesmo usuário: statements SQL e
+latência com e sem o single-flight do SharedCache (cache desligado, só a
+coalescência das leituras concorrentes).
+
+    python -m benchmarks.bench_coalescing --concurrency 50 --bursts 20
+"""
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import event
+
+from benchmarks.common import app_client, summarize
+from fastapi_zero.cache import SingleFlight, shared_cache
+from fastapi_zero.models import Todo, TodoState, User
+from fastapi_zero.security import create_access_token
+
+
+class NoFlight(SingleFlight):
+    @staticmethod
+    async def do(key, func, label=''):
+        return await func()
+
+
+async def seed(engine, todos: int):
+    async with engine.begin() as conn:
+        await conn.execute(
+            User.__table__.insert().values(
+                username='bench', email='bench@example.com', password='x'
+            )
+        )
+        await conn.execute(
+            Todo.__table__.insert(),
+            [
+                {
+                    'title': f'todo {n}',
+                    'description': 'benchmark',
+                    'state': TodoState.todo,
+                    'user_id': 1,
+                }
+                for n in range(todos)
+            ],
+        )
+
+
+async def burst(client, headers, concurrency: int) -> list[float]:
+    async def one():
+        start = time.perf_counter()
+        response = await client.get('/todos/?state=todo', headers=headers)
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    return await asyncio.gather(*(one() for _ in range(concurrency)))
+
+
+async def run(concurrency: int, bursts: int, todos: int):
+    token = create_access_token({'sub': 'bench@example.com'})
+    headers = {'Authorization': f'Bearer {token}'}
+    for name, flight in (('sem', NoFlight()), ('com', SingleFlight())):
+        shared_cache.flight = flight
+        async with app_client() as (client, engine):
+            await seed(engine, todos)
+            await burst(client, headers, 1)  # autentica e aquece
+
+            statements = 0
+
+            def count(*args):
+                nonlocal statements
+                statements += 1
+
+            event.listen(engine.sync_engine, 'before_cursor_execute', count)
+            latencies = []
+            start = time.perf_counter()
+            for _ in range(bursts):
+                latencies += await burst(client, headers, concurrency)
+            elapsed = time.perf_counter() - start
+            event.remove(engine.sync_engine, 'before_cursor_execute', count)
+
+        stats = summarize(latencies, elapsed)
+        ratio = sum(flight.coalesced.values()) / max(
+            1, sum(flight.calls.values())
+        )
+        print(
+            f'{name} coalescência: {statements / len(latencies):.2f} '
+            f'statements/req, p50 {stats["p50_ms"]} ms, '
+            f'p99 {stats["p99_ms"]} ms, {stats["rps"]} req/s, '
+            f'coalescidas {ratio:.0%}'
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--bursts', type=int, default=20)
+    parser.add_argument('--todos', type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(run(args.concurrency, args.bursts, args.todos))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Throughput de POST /auth/token conforme o número de workers do pool de
+hashing (Argon2).
+
+    python -m benchmarks.bench_login --requests 200 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.common import app_client, summarize, timed
+from fastapi_zero import security
+from fastapi_zero.models import User
+from fastapi_zero.security import HashingPool, get_passaword_hash
+
+PASSWORD = 'senha-do-benchmark'
+
+
+async def run(requests: int, concurrency: int, workers: int, kind: str):
+    security.hashing_pool = HashingPool(kind, workers, max_pending=10_000)
+    async with app_client() as (client, engine):
+        async with engine.begin() as conn:
+            await conn.execute(
+                User.__table__.insert().values(
+                    username='bench',
+                    email='bench@example.com',
+                    password=get_passaword_hash(PASSWORD),
+                )
+            )
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        @timed
+        async def login():
+            async with semaphore:
+                response = await client.post(
+                    '/auth/token',
+                    data={
+                        'username': 'bench@example.com',
+                        'password': PASSWORD,
+                    },
+                )
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(login() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    security.hashing_pool.shutdown()
+    return summarize(latencies, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument(
+        '--kind', choices=['thread', 'process'], default='thread'
+    )
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    workers = sorted({1, 2, 4, cpus // 2 or 1, cpus})
+    for count in workers:
+        result = asyncio.run(
+            run(args.requests, args.concurrency, count, args.kind)
+        )
+        print(f'workers={count:<3} {result}')
+
+
+if __name__ == '__main__':
+    main()
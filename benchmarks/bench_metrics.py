@@ -0,0 +1,84 @@
+"""
+Overhead por requisição do MetricsMiddleware e do QueryStatsMiddleware,
+comparando a mesma rota com e sem os middlewares.
+
+    python -m benchmarks.bench_metrics --requests 20000
+"""
+
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI
+
+from fastapi_zero.instrumentation import QueryStatsMiddleware
+from fastapi_zero.metrics import MetricsMiddleware
+
+
+def build_app():
+    app = FastAPI()
+
+    @app.get('/items/{item_id}')
+    async def read_item(item_id: int):
+        return {'id': item_id}
+
+    return app
+
+
+async def call(app, path: str):
+    scope = {
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'headers': [],
+        'scheme': 'http',
+        'server': ('bench', 80),
+        'client': ('bench', 1234),
+        'root_path': '',
+        'http_version': '1.1',
+    }
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def measure(app, requests: int) -> float:
+    for n in range(100):
+        await call(app, f'/items/{n}')
+    start = time.perf_counter()
+    for n in range(requests):
+        await call(app, f'/items/{n}')
+    return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=20_000)
+    args = parser.parse_args()
+
+    app = build_app()
+    variants = {
+        'sem middleware': app,
+        'MetricsMiddleware': MetricsMiddleware(app),
+        'Metrics + QueryStats': MetricsMiddleware(QueryStatsMiddleware(app)),
+    }
+    baseline = None
+    for name, variant in variants.items():
+        per_request = asyncio.run(measure(variant, args.requests))
+        baseline = baseline or per_request
+        overhead = per_request - baseline
+        print(
+            f'{name:<22} {per_request * 1e6:8.1f} us/req '
+            f'(+{overhead * 1e6:.1f} us)'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Latência de uma página profunda de GET /todos/: OFFSET/LIMIT vs cursor.
+
+    python -m benchmarks.bench_pagination --todos 1000000 --page 1000
+"""
+
+import argparse
+import asyncio
+import time
+from statistics import median
+
+from benchmarks.common import app_client
+from fastapi_zero.models import Todo, TodoState, User
+from fastapi_zero.pagination import encode_cursor
+from fastapi_zero.security import create_access_token
+
+PAGE_SIZE = 10
+CHUNK = 10_000
+
+
+async def seed(engine, todos: int):
+    async with engine.begin() as conn:
+        await conn.execute(
+            User.__table__.insert().values(
+                username='bench', email='bench@example.com', password='x'
+            )
+        )
+        for start in range(0, todos, CHUNK):
+            await conn.execute(
+                Todo.__table__.insert(),
+                [
+                    {
+                        'title': f'todo {n}',
+                        'description': 'benchmark',
+                        'state': TodoState.todo,
+                        'user_id': 1,
+                    }
+                    for n in range(start, min(start + CHUNK, todos))
+                ],
+            )
+
+
+async def run(todos: int, page: int, repeat: int):
+    async with app_client() as (client, engine):
+        await seed(engine, todos)
+        token = create_access_token({'sub': 'bench@example.com'})
+        headers = {'Authorization': f'Bearer {token}'}
+        offset = (page - 1) * PAGE_SIZE
+        # ids são sequenciais no seed: o cursor da página anterior é o offset
+        cursor = encode_cursor(offset)
+        urls = {
+            'offset': f'/todos/?offset={offset}&limit={PAGE_SIZE}',
+            'cursor': f'/todos/?cursor={cursor}&limit={PAGE_SIZE}',
+        }
+        for mode, url in urls.items():
+            await client.get(url, headers=headers)  # aquece o token cache
+            latencies = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                response = await client.get(url, headers=headers)
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+            first_id = response.json()['todos'][0]['id']
+            print(
+                f'{mode:<7} page={page} first_id={first_id} '
+                f'median={median(latencies) * 1000:.2f}ms'
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--todos', type=int, default=1_000_000)
+    parser.add_argument('--page', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.todos, args.page, args.repeat))
+
+
+if __name__ == '__main__':
+    main()
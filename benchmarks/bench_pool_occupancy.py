@@ -0,0 +1,167 @@
+"""
+Ocupação do pool em GET /todos/ sob carga concorrente, com as
+dependências de sessão reais e um usuário diferente a cada requisição (o
+principal sempre vem do banco). Mede o tempo de conexão fora do pool e a
+espera por uma conexão por requisição, e quantas estouraram o
+pool_timeout, comparando:
+
+- como era: sessões fechadas só no fim da requisição e a sessão da
+  autenticação segurando a conexão até lá;
+- agora: SessionRoute fecha as sessões quando o endpoint retorna e a
+  autenticação devolve a conexão logo depois da consulta.
+
+    python -m benchmarks.bench_pool_occupancy --concurrency 20 --requests 2000
+"""
+
+import argparse
+import asyncio
+import itertools
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import select
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from benchmarks.common import app_client, summarize
+from fastapi_zero import database, security
+from fastapi_zero.app import app
+from fastapi_zero.database import TimedQueuePool, pool_status
+from fastapi_zero.models import Todo, TodoState, User
+from fastapi_zero.security import create_access_token
+
+POOL_SIZE = 5
+POOL_TIMEOUT = 2
+USERS = 500
+TODOS = 10
+
+
+async def _load_principal_without_release(session, email):
+    row = (
+        await session.execute(
+            select(User.id, User.email, User.username).where(
+                User.email == email
+            )
+        )
+    ).one_or_none()
+    return list(row) if row else None
+
+
+@contextmanager
+def real_sessions(engine, release: bool):
+    """Dependências reais apontando para o banco do benchmark."""
+    overrides = dict(app.dependency_overrides)
+    app.dependency_overrides.clear()
+    patched = {
+        (database, 'engine'): engine,
+        (database.replica_set, 'primary'): engine,
+    }
+    if not release:
+        patched[database, 'track_session'] = lambda session: None
+        patched[security, '_load_principal'] = _load_principal_without_release
+    saved = {target: getattr(*target) for target in patched}
+    for (obj, name), value in patched.items():
+        setattr(obj, name, value)
+    try:
+        yield
+    finally:
+        for (obj, name), value in saved.items():
+            setattr(obj, name, value)
+        app.dependency_overrides.update(overrides)
+
+
+async def seed(engine):
+    async with engine.begin() as conn:
+        await conn.execute(
+            User.__table__.insert(),
+            [
+                {
+                    'username': f'user{n}',
+                    'email': f'user{n}@example.com',
+                    'password': 'x',
+                }
+                for n in range(USERS)
+            ],
+        )
+        await conn.execute(
+            Todo.__table__.insert(),
+            [
+                {
+                    'title': f'todo {n}',
+                    'description': 'benchmark ' * 20,
+                    'state': TodoState.todo,
+                    'user_id': user_id,
+                }
+                for user_id in range(1, USERS + 1)
+                for n in range(TODOS)
+            ],
+        )
+
+
+async def load(client, concurrency: int, requests: int):
+    latencies = []
+    timeouts = []
+    # um usuário diferente por requisição: nem o cache de tokens nem a
+    # coalescência evitam as consultas
+    tokens = (
+        create_access_token({'sub': f'user{n % USERS}@example.com', 'n': n})
+        for n in itertools.count()
+    )
+
+    async def worker(count: int):
+        for _ in range(count):
+            headers = {'Authorization': f'Bearer {next(tokens)}'}
+            start = time.perf_counter()
+            try:
+                response = await client.get('/todos/', headers=headers)
+            except PoolTimeoutError:
+                timeouts.append(start)
+                continue
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(worker(requests // concurrency) for _ in range(concurrency))
+    )
+    return latencies, len(timeouts), time.perf_counter() - start
+
+
+async def run(concurrency: int, requests: int):
+    for name, release in (('como era', False), ('agora', True)):
+        async with app_client(
+            poolclass=TimedQueuePool,
+            pool_size=POOL_SIZE,
+            max_overflow=0,
+            pool_timeout=POOL_TIMEOUT,
+        ) as (client, engine):
+            await seed(engine)
+            with real_sessions(engine, release):
+                before = pool_status(engine)
+                latencies, timeouts, elapsed = await load(
+                    client, concurrency, requests
+                )
+                after = pool_status(engine)
+
+        held = after['hold_seconds_total'] - before['hold_seconds_total']
+        waited = after['wait_seconds_total'] - before['wait_seconds_total']
+        checkouts = after['hold_count'] - before['hold_count']
+        stats = summarize(latencies, elapsed)
+        print(
+            f'{name:<9} conexão fora do pool {held / requests * 1e3:.2f} '
+            f'ms/req em {checkouts / requests:.1f} checkouts, espera '
+            f'{waited / requests * 1e3:.2f} ms/req, p50 {stats["p50_ms"]} '
+            f'ms, p99 {stats["p99_ms"]} ms, {stats["rps"]} req/s, '
+            f'{timeouts} sem conexão'
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.concurrency, args.requests))
+
+
+if __name__ == '__main__':
+    main()
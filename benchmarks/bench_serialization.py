@@ -0,0 +1,81 @@
+"""
+CPU por resposta de GET /todos/ para uma página de N itens: caminho padrão
+do FastAPI (validação pelo response_model + jsonable_encoder + json) contra
+FAST_JSON_RESPONSES (dicts do banco direto no orjson).
+
+    python -m benchmarks.bench_serialization --items 100
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+
+from fastapi_zero.app import app
+from fastapi_zero.models import Todo, TodoState
+from fastapi_zero.responses import FastJSONResponse, public_dicts
+from fastapi_zero.schemas import TodoPublic
+
+
+def make_todos(items: int) -> list[Todo]:
+    todos = []
+    for n in range(items):
+        todo = Todo(
+            title=f'todo {n}',
+            description='descrição do benchmark',
+            state=TodoState.todo,
+            user_id=1,
+        )
+        todo.id = n
+        todo.created_at = todo.updated_at = datetime(2026, 1, 1)
+        todos.append(todo)
+    return todos
+
+
+async def default_path(route, todos):
+    content = await serialize_response(
+        field=route.response_field,
+        response_content={'todos': todos, 'next_cursor': None},
+        is_coroutine=True,
+    )
+    return JSONResponse(content).body
+
+
+async def fast_path(route, todos):
+    content = {'todos': public_dicts(todos, TodoPublic), 'next_cursor': None}
+    return FastJSONResponse(content).body
+
+
+async def measure(func, route, todos, rounds: int) -> float:
+    start = time.process_time()
+    for _ in range(rounds):
+        await func(route, todos)
+    return (time.process_time() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=100)
+    parser.add_argument('--rounds', type=int, default=2000)
+    args = parser.parse_args()
+
+    route = next(
+        route
+        for route in app.routes
+        if getattr(route, 'path', None) == '/todos/' and 'GET' in route.methods
+    )
+    todos = make_todos(args.items)
+    assert asyncio.run(default_path(route, todos)) == asyncio.run(
+        fast_path(route, todos)
+    )
+
+    for name, func in (('padrão', default_path), ('fast', fast_path)):
+        per_response = asyncio.run(measure(func, route, todos, args.rounds))
+        print(f'{name:<8} {per_response * 1e6:9.1f} us de CPU por resposta')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Custo de montar, compilar e executar as consultas quentes
+(fastapi_zero.statements) por requisição, comparando:
+
+- sem cache: select reconstruído e compilado a cada chamada
+  (query_cache_size=0);
+- select: reconstruído a cada chamada, compilação vinda do cache do
+  SQLAlchemy (como era);
+- lambda_stmt: cache de consulta por lambda, reconstruída com os
+  parâmetros pela Session a cada execução;
+- pré-montadas: as consultas de fastapi_zero.statements, com bindparam.
+
+Cada "requisição" executa o principal por e-mail, a versão dos todos e o
+todo do dono, como um PATCH /todos/{id}. Com BENCH_DATABASE_URL apontando
+para um Postgres (postgresql+psycopg://...) a execução também usa os
+prepared statements do servidor.
+
+    python -m benchmarks.bench_statements --requests 5000
+"""
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import lambda_stmt, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from benchmarks.common import app_client
+from fastapi_zero import statements
+from fastapi_zero.models import Todo, TodoState, User
+
+USERS = 100
+
+
+def rebuilt_statements(email: str, user_id: int, todo_id: int):
+    return (
+        (
+            select(User.id, User.email, User.username).where(
+                User.email == email
+            ),
+        ),
+        (select(User.todos_version).where(User.id == user_id),),
+        (select(Todo).where(Todo.user_id == user_id, Todo.id == todo_id),),
+    )
+
+
+def lambda_statements(email: str, user_id: int, todo_id: int):
+    return (
+        (
+            lambda_stmt(
+                lambda: select(User.id, User.email, User.username).where(
+                    User.email == email
+                )
+            ),
+        ),
+        (
+            lambda_stmt(
+                lambda: select(User.todos_version).where(User.id == user_id)
+            ),
+        ),
+        (
+            lambda_stmt(
+                lambda: select(Todo).where(
+                    Todo.user_id == user_id, Todo.id == todo_id
+                )
+            ),
+        ),
+    )
+
+
+def prebuilt_statements(email: str, user_id: int, todo_id: int):
+    return (
+        (statements.PRINCIPAL_BY_EMAIL, {'email': email}),
+        (statements.TODOS_VERSION, {'user_id': user_id}),
+        (
+            statements.OWNED_TODO,
+            {'user_id': user_id, 'todo_id': todo_id},
+        ),
+    )
+
+
+async def seed(engine):
+    async with engine.begin() as conn:
+        await conn.execute(
+            User.__table__.insert(),
+            [
+                {
+                    'username': f'user{n}',
+                    'email': f'user{n}@example.com',
+                    'password': 'x',
+                }
+                for n in range(USERS)
+            ],
+        )
+        await conn.execute(
+            Todo.__table__.insert(),
+            [
+                {
+                    'title': 'todo',
+                    'description': 'benchmark',
+                    'state': TodoState.todo,
+                    'user_id': user_id,
+                }
+                for user_id in range(1, USERS + 1)
+            ],
+        )
+
+
+async def measure(engine, build, requests: int) -> float:
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        for n in range(-100, requests):  # as 100 primeiras aquecem
+            if n == 0:
+                start = time.perf_counter()
+            user_id = n % USERS + 1
+            principal, version, todo = build(
+                f'user{user_id - 1}@example.com', user_id, user_id
+            )
+            assert (await session.execute(*principal)).one()
+            assert await session.scalar(*version) is not None
+            assert await session.scalar(*todo) is not None
+            session.expunge_all()
+        return (time.perf_counter() - start) / requests
+
+
+async def run(requests: int):
+    variants = (
+        ('sem cache', rebuilt_statements, 0),
+        ('select', rebuilt_statements, 500),
+        ('lambda_stmt', lambda_statements, 500),
+        ('pré-montadas', prebuilt_statements, 500),
+    )
+    for name, build, cache_size in variants:
+        async with app_client(query_cache_size=cache_size) as (_, engine):
+            await seed(engine)
+            per_request = await measure(engine, build, requests)
+        print(f'{name:<13} {per_request * 1e6:8.1f} us por requisição')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests))
+
+
+if __name__ == '__main__':
+    main()
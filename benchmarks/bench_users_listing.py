@@ -0,0 +1,108 @@
+"""
+Listagem de 10k usuários: entidades User completas (como era) contra as
+colunas de UserPublic. Mede pico de memória (tracemalloc) e tempo para
+percorrer todos os usuários, na consulta e via GET /users/ com cursor.
+
+    python -m benchmarks.bench_users_listing --users 10000
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from benchmarks.common import app_client
+from fastapi_zero.models import User
+from fastapi_zero.responses import public_columns, public_dicts
+from fastapi_zero.schemas import UserPublic
+from fastapi_zero.security import create_access_token
+
+CHUNK = 5_000
+
+
+async def seed(engine, users: int):
+    async with engine.begin() as conn:
+        for start in range(0, users, CHUNK):
+            await conn.execute(
+                User.__table__.insert(),
+                [
+                    {
+                        'username': f'user{n}',
+                        'email': f'user{n}@example.com',
+                        'password': '$argon2id$v=19$m=65536,t=3,p=4$'
+                        + 'x' * 64,
+                    }
+                    for n in range(start, min(start + CHUNK, users))
+                ],
+            )
+
+
+async def load(engine, projected: bool):
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        if projected:
+            rows = (
+                await session.execute(
+                    select(*public_columns(User, UserPublic))
+                )
+            ).all()
+        else:
+            rows = (await session.scalars(select(User))).all()
+        return public_dicts(rows, UserPublic)
+
+
+async def measure_query(engine, projected: bool):
+    tracemalloc.start()
+    start = time.perf_counter()
+    await load(engine, projected)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+async def walk_pages(client) -> tuple[int, float]:
+    token = create_access_token({'sub': 'user0@example.com'})
+    headers = {'Authorization': f'Bearer {token}'}
+    cursor, pages = None, 0
+    start = time.perf_counter()
+    while True:
+        params = {'limit': 10, **({'cursor': cursor} if cursor else {})}
+        response = await client.get('/users/', params=params, headers=headers)
+        response.raise_for_status()
+        pages += 1
+        cursor = response.json()['next_cursor']
+        if cursor is None:
+            return pages, time.perf_counter() - start
+
+
+async def run(users: int):
+    async with app_client() as (client, engine):
+        await seed(engine, users)
+        await load(engine, projected=True)  # aquece
+
+        for name, projected in (('entidades', False), ('colunas', True)):
+            elapsed, peak = await measure_query(engine, projected)
+            print(
+                f'{name:<10} {users} usuários: {elapsed * 1000:7.1f} ms, '
+                f'pico {peak / 1024 / 1024:6.2f} MiB'
+            )
+
+        pages, elapsed = await walk_pages(client)
+        print(
+            f'GET /users/ {pages} páginas: {elapsed:.2f} s '
+            f'({elapsed / pages * 1000:.2f} ms/página)'
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=10_000)
+    args = parser.parse_args()
+    asyncio.run(run(args.users))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Utilitários compartilhados pelos benchmarks.
+
+Os benchmarks rodam a aplicação em processo (httpx + ASGITransport) contra
+um SQLite em arquivo temporário, ou contra o banco indicado em
+BENCH_DATABASE_URL (ex.: um Postgres local).
+"""
+
+import os
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from statistics import quantiles
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from fastapi_zero.app import app
+from fastapi_zero.database import (
+    get_read_session,
+    get_session,
+    track_session,
+)
+from fastapi_zero.models import table_registry
+
+
+@asynccontextmanager
+async def app_client(
+    database_url: str | None = None, track_sessions: bool = False, **options
+):
+    """
+    `track_sessions` registra as sessões como as dependências reais fazem,
+    para que as rotas as fechem assim que o endpoint retorna.
+    """
+    database_url = database_url or os.environ.get('BENCH_DATABASE_URL')
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = database_url or f'sqlite+aiosqlite:///{tmp}/bench.db'
+        engine = create_async_engine(database_url, **options)
+
+        async with engine.begin() as conn:
+            await conn.run_sync(table_registry.metadata.drop_all)
+            await conn.run_sync(table_registry.metadata.create_all)
+
+        async def get_session_override():
+            async with AsyncSession(engine, expire_on_commit=False) as session:
+                if track_sessions:
+                    track_session(session)
+                yield session
+
+        app.dependency_overrides[get_session] = get_session_override
+        app.dependency_overrides[get_read_session] = get_session_override
+        transport = ASGITransport(app=app)
+        try:
+            async with AsyncClient(
+                transport=transport, base_url='http://bench'
+            ) as client:
+                yield client, engine
+        finally:
+            app.dependency_overrides.clear()
+            await engine.dispose()
+
+
+def summarize(latencies: list[float], elapsed: float) -> dict:
+    """p50/p95/p99 em milissegundos e requests por segundo."""
+    cuts = quantiles(latencies, n=100, method='inclusive')
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(cuts[49] * 1000, 2),
+        'p95_ms': round(cuts[94] * 1000, 2),
+        'p99_ms': round(cuts[98] * 1000, 2),
+    }
+
+
+def timed(func):
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        await func(*args, **kwargs)
+        return time.perf_counter() - start
+
+    return wrapper
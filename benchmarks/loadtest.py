@@ -0,0 +1,223 @@
+"""
+Gerador de carga assíncrono para todos os routers.
+
+Roda cada cenário com N requests e C em paralelo contra a aplicação em
+processo, com o banco semeado (SQLite temporário ou BENCH_DATABASE_URL,
+ex.: postgresql+psycopg://postgres@localhost/bench), e reporta p50/p95/p99,
+RPS e queries por request.
+
+    python -m benchmarks.loadtest                    # só reporta
+    python -m benchmarks.loadtest --save-baseline    # grava baseline.json
+    python -m benchmarks.loadtest --check            # falha se regredir
+
+Queries por request é determinístico e qualquer aumento falha. Latência
+só falha acima de --tolerance vezes o p95 do baseline, que depende da
+máquina: gere o baseline na mesma máquina onde o --check roda.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import time
+from functools import cache
+from pathlib import Path
+
+from sqlalchemy import event, insert
+
+from benchmarks.common import app_client, summarize
+from fastapi_zero.models import Todo, TodoState, User
+from fastapi_zero.security import create_access_token, get_passaword_hash
+
+BASELINE = Path(__file__).with_name('baseline.json')
+PASSWORD = 'senha-do-benchmark'
+SEED_USERS = 200
+SEED_TODOS = 5_000
+# Argon2 domina os três primeiros; users_delete consome usuários semeados
+FEWER_REQUESTS = {'auth_token', 'users_create', 'users_update', 'users_delete'}
+
+
+async def seed(engine):
+    password = get_passaword_hash(PASSWORD)
+    async with engine.begin() as conn:
+        await conn.execute(
+            insert(User),
+            [
+                {
+                    'username': f'user{n}',
+                    'email': f'user{n}@example.com',
+                    'password': password,
+                }
+                for n in range(1, SEED_USERS + 1)
+            ],
+        )
+        await conn.execute(
+            insert(Todo),
+            [
+                {
+                    'title': f'tarefa {n} comprar leite',
+                    'description': f'descricao {n}',
+                    'state': list(TodoState)[n % len(TodoState)],
+                    'user_id': 1,
+                }
+                for n in range(SEED_TODOS)
+            ],
+        )
+
+
+@cache
+def auth(user_id=1):
+    token = create_access_token({'sub': f'user{user_id}@example.com'})
+    return {'Authorization': f'Bearer {token}'}
+
+
+def scenarios():
+    """Cada cenário recebe (client, n) e faz um request."""
+    todo_ids = itertools.count(1)
+    delete_ids = itertools.count(SEED_TODOS, -1)
+    new_users = itertools.count()
+    doomed_users = itertools.count(SEED_USERS, -1)
+
+    return {
+        'auth_token': lambda c, n: c.post(
+            '/auth/token',
+            data={'username': 'user1@example.com', 'password': PASSWORD},
+        ),
+        'auth_refresh_token': lambda c, n: c.post(
+            '/auth/refresh_token', headers=auth()
+        ),
+        'users_create': lambda c, n: c.post(
+            '/users/',
+            json={
+                'username': f'new{(i := next(new_users))}',
+                'email': f'new{i}@example.com',
+                'password': PASSWORD,
+            },
+        ),
+        'users_list': lambda c, n: c.get('/users/?offset=50', headers=auth()),
+        'users_read': lambda c, n: c.get(f'/users/{n % SEED_USERS + 1}/'),
+        'users_update': lambda c, n: c.put(
+            '/users/2/',
+            headers=auth(2),
+            json={
+                'username': 'user2',
+                'email': 'user2@example.com',
+                'password': PASSWORD,
+            },
+        ),
+        'users_delete': lambda c, n: c.delete(
+            f'/users/{(i := next(doomed_users))}/', headers=auth(i)
+        ),
+        'todos_create': lambda c, n: c.post(
+            '/todos/',
+            headers=auth(),
+            json={'title': f'nova {n}', 'description': 'carga'},
+        ),
+        'todos_list': lambda c, n: c.get(
+            '/todos/?offset=100&state=todo', headers=auth()
+        ),
+        'todos_search': lambda c, n: c.get(
+            '/todos/?title=leite', headers=auth()
+        ),
+        'todos_update': lambda c, n: c.patch(
+            f'/todos/{next(todo_ids)}', headers=auth(), json={'state': 'done'}
+        ),
+        'todos_delete': lambda c, n: c.delete(
+            f'/todos/{next(delete_ids)}', headers=auth()
+        ),
+    }
+
+
+async def run_scenario(client, engine, request, requests, concurrency):
+    statements = 0
+
+    def count(*args):
+        nonlocal statements
+        statements += 1
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(n):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await request(client, n)
+            latencies.append(time.perf_counter() - start)
+            if response.is_error:
+                raise RuntimeError(f'{response.status_code} {response.text}')
+
+    await request(client, -1)  # aquecimento (token cache, compilação)
+    event.listen(engine.sync_engine, 'before_cursor_execute', count)
+    start = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(requests)))
+    elapsed = time.perf_counter() - start
+    event.remove(engine.sync_engine, 'before_cursor_execute', count)
+
+    return {
+        **summarize(latencies, elapsed),
+        'queries_per_request': round(statements / requests, 2),
+    }
+
+
+async def run(requests, concurrency, only):
+    results = {}
+    async with app_client() as (client, engine):
+        await seed(engine)
+        for name, request in scenarios().items():
+            if only and name not in only:
+                continue
+            total = requests // 10 if name in FEWER_REQUESTS else requests
+            results[name] = await run_scenario(
+                client, engine, request, total, concurrency
+            )
+            print(f'{name:<20} {results[name]}')
+    return results
+
+
+def check(results, baseline, tolerance):
+    failures = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        expected = baseline[name]
+        if result['queries_per_request'] > expected['queries_per_request']:
+            failures.append(
+                f'{name}: queries/request {result["queries_per_request"]} '
+                f'> {expected["queries_per_request"]}'
+            )
+        if result['p95_ms'] > expected['p95_ms'] * tolerance:
+            failures.append(
+                f'{name}: p95 {result["p95_ms"]}ms > '
+                f'{tolerance} x {expected["p95_ms"]}ms'
+            )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--only', nargs='*', default=[])
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--check', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=1.5)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.requests, args.concurrency, args.only))
+
+    if args.save_baseline:
+        BASELINE.write_text(json.dumps(results, indent=2) + '\n')
+        print(f'baseline salvo em {BASELINE}')
+
+    if args.check:
+        failures = check(
+            results, json.loads(BASELINE.read_text()), args.tolerance
+        )
+        for failure in failures:
+            print(f'REGRESSÃO {failure}')
+        sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
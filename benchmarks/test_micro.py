@@ -0,0 +1,74 @@
+"""
+Micro-benchmarks (pytest-benchmark) dos caminhos quentes que não dependem
+de I/O.
+
+    pytest benchmarks --benchmark-autosave
+    pytest benchmarks --benchmark-compare
+"""
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from fastapi_zero.models import Todo
+from fastapi_zero.pagination import decode_cursor, encode_cursor
+from fastapi_zero.schemas import TodoList
+from fastapi_zero.search import search_todos
+from fastapi_zero.security import create_access_token, principal_cache
+
+pytest.importorskip('pytest_benchmark')
+
+
+def test_create_access_token(benchmark):
+    token = benchmark(create_access_token, {'sub': 'bench@example.com'})
+
+    assert token
+
+
+def test_principal_cache_hit(benchmark):
+    principal_cache.set('token', object(), expires_at=float('inf'))
+
+    result = benchmark(principal_cache.get, 'token')
+
+    assert result is not None
+    principal_cache.clear()
+
+
+def test_cursor_roundtrip(benchmark):
+    expected = 123_456
+
+    result = benchmark(lambda: decode_cursor(encode_cursor(expected)))
+
+    assert result == expected
+
+
+@pytest.mark.parametrize('dialect', [sqlite.dialect(), postgresql.dialect()])
+def test_compile_search_query(benchmark, dialect):
+    def compile_query():
+        query = search_todos(
+            select(Todo), dialect.name, 'compras mercado', 'leite'
+        )
+        return str(query.compile(dialect=dialect))
+
+    assert benchmark(compile_query)
+
+
+def test_serialize_todo_list(benchmark):
+    page = {
+        'todos': [
+            {
+                'id': n,
+                'title': f'todo {n}',
+                'description': 'benchmark',
+                'state': 'todo',
+                'created_at': '2026-01-01T00:00:00',
+                'updated_at': '2026-01-01T00:00:00',
+            }
+            for n in range(100)
+        ],
+        'next_cursor': None,
+    }
+
+    result = benchmark(lambda: TodoList.model_validate(page).model_dump_json())
+
+    assert result
@@ -1,17 +1,57 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from dataclasses import asdict
 from http import HTTPStatus
+from typing import Annotated
 
 import uvicorn
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from fastapi_zero.cache import shared_cache
+from fastapi_zero.database import get_session, monitor_replicas, replica_set
+from fastapi_zero.health import ReadinessProbe, migration_head
+from fastapi_zero.instrumentation import QueryStatsMiddleware
+from fastapi_zero.metrics import (
+    MetricsMiddleware,
+    monitor_event_loop_lag,
+    registry,
+)
 from fastapi_zero.routers import auth, todos, users
 from fastapi_zero.schemas import (
     Message,
+    ReadinessPublic,
 )
+from fastapi_zero.security import hashing_pool
 from fastapi_zero.settings import Settings
 
-app = FastAPI(title='Minha Api Bala!')
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = [
+        asyncio.create_task(
+            monitor_event_loop_lag(settings.EVENT_LOOP_LAG_INTERVAL)
+        )
+    ]
+    if replica_set.replicas:
+        tasks.append(
+            asyncio.create_task(
+                monitor_replicas(replica_set, settings.REPLICA_HEALTH_INTERVAL)
+            )
+        )
+    yield
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    hashing_pool.shutdown()
+    await shared_cache.close()
+
+
+settings = Settings()
+app = FastAPI(title='Minha Api Bala!', lifespan=lifespan)
 
 # Configuração CORS para permitir o frontend React
 app.add_middleware(
@@ -21,11 +61,15 @@ app.add_middleware(
     allow_methods=['*'],
     allow_headers=['*'],
 )
+app.add_middleware(QueryStatsMiddleware, debug=settings.DEBUG)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(todos.router)
-settings = Settings()
+readiness_probe = ReadinessProbe(
+    ttl=settings.READINESS_CACHE_SECONDS, head=migration_head()
+)
 
 
 @app.get('/healthcheck/', status_code=HTTPStatus.OK, response_model=Message)
@@ -33,6 +77,34 @@ async def healthcheck():
     return {'message': 'Health - OK'}
 
 
+@app.get('/livez', status_code=HTTPStatus.OK, response_model=Message)
+async def livez():
+    return {'message': 'alive'}
+
+
+@app.get(
+    '/readyz',
+    status_code=HTTPStatus.OK,
+    response_model=ReadinessPublic,
+    responses={HTTPStatus.SERVICE_UNAVAILABLE: {'model': ReadinessPublic}},
+)
+async def readyz(
+    response: Response,
+    session: Annotated[AsyncSession, Depends(get_session)],
+):
+    readiness = await readiness_probe.check(session)
+    if not readiness.ready:
+        response.status_code = HTTPStatus.SERVICE_UNAVAILABLE
+    return asdict(readiness)
+
+
+@app.get('/metrics', response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(
+        registry.render(), media_type='text/plain; version=0.0.4'
+    )
+
+
 @app.get('/', status_code=HTTPStatus.OK, response_model=Message)
 async def read_root():
     return {'message': 'Olá mundo!'}
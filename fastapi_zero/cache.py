@@ -0,0 +1,429 @@
+import asyncio
+import time
+from collections import Counter, OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from contextlib import suppress
+from functools import partial
+from hashlib import sha256
+from typing import Any, Protocol
+from urllib.parse import urlsplit
+
+from fastapi_zero.responses import dumps, loads
+from fastapi_zero.settings import Settings
+
+
+class TTLCache:
+    """
+    Cache LRU em memória (por processo) com expiração por entrada.
+    `expires_at` é um timestamp unix, o mesmo formato do `exp` do JWT.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None or item[0] <= time.time():
+            self._data.pop(key, None)
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def set(self, key: Hashable, value: Any, expires_at: float):
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def discard_where(self, predicate: Callable[[Any], bool]):
+        for key in [k for k, (_, v) in self._data.items() if predicate(v)]:
+            del self._data[key]
+
+    def clear(self):
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+class CacheError(Exception):
+    """Falha do backend de cache; o SharedCache trata como miss."""
+
+
+class CacheBackend(Protocol):
+    async def get(self, key: str) -> bytes | None: ...
+
+    async def set(
+        self, key: str, value: bytes, ttl: float, only_if_missing: bool
+    ): ...
+
+    async def delete(self, *keys: str): ...
+
+    async def close(self): ...
+
+
+class MemoryCache:
+    """
+    Backend no próprio processo, sobre o TTLCache. Guarda bytes, como o
+    Redis, para que ninguém altere um valor já cacheado. Só é coerente com
+    um worker: a invalidação não chega aos outros processos.
+    """
+
+    def __init__(self, maxsize: int):
+        self._data = TTLCache(maxsize)
+
+    async def get(self, key: str) -> bytes | None:
+        return self._data.get(key)
+
+    async def set(
+        self, key: str, value: bytes, ttl: float, only_if_missing: bool
+    ):
+        if only_if_missing and self._data.get(key) is not None:
+            return
+        self._data.set(key, value, time.time() + ttl)
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._data.pop(key)
+
+    async def close(self):
+        pass
+
+    def clear(self):
+        self._data.clear()
+
+
+def _encode_command(args: tuple) -> bytes:
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(b'$%d\r\n%s\r\n' % (len(data), data))
+    return b''.join(parts)
+
+
+class RedisCache:
+    """
+    Cliente mínimo do protocolo do Redis (RESP), serve também para Valkey
+    e KeyDB. Só os comandos que o cache usa, uma conexão por worker e um
+    comando por vez: cada operação é um round trip curto.
+    """
+
+    def __init__(self, url: str, timeout: float = 1.0):
+        parts = urlsplit(url)
+        self.host = parts.hostname or 'localhost'
+        self.port = parts.port or 6379
+        self.password = parts.password
+        self.db = int(parts.path.lstrip('/') or 0)
+        self.timeout = timeout
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._lock = asyncio.Lock()
+
+    async def execute(self, *args):
+        async with self._lock:
+            try:
+                async with asyncio.timeout(self.timeout):
+                    if self._writer is None:
+                        await self._connect()
+                    return await self._call(args)
+            except (OSError, EOFError, TimeoutError) as error:
+                # conexão num estado desconhecido: reabre no próximo comando
+                await self.close()
+                raise CacheError(str(error) or type(error).__name__)
+            except BaseException:
+                # cancelado entre o envio e a leitura: a resposta ainda vai
+                # chegar no socket e seria lida pelo próximo comando
+                await self.close()
+                raise
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(
+            self.host, self.port
+        )
+        if self.password:
+            await self._call(('AUTH', self.password))
+        if self.db:
+            await self._call(('SELECT', self.db))
+
+    async def _call(self, args: tuple):
+        self._writer.write(_encode_command(args))
+        await self._writer.drain()
+        return await self._read_reply()
+
+    async def _read_reply(self):
+        line = await self._reader.readuntil(b'\r\n')
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload.decode()
+        if kind == b'-':
+            raise CacheError(payload.decode())
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            size = int(payload)
+            if size < 0:
+                return None
+            return (await self._reader.readexactly(size + 2))[:-2]
+        if kind == b'*':
+            size = int(payload)
+            if size < 0:
+                return None
+            return [await self._read_reply() for _ in range(size)]
+        raise CacheError(f'Unexpected reply: {line!r}')
+
+    async def get(self, key: str) -> bytes | None:
+        return await self.execute('GET', key)
+
+    async def set(
+        self, key: str, value: bytes, ttl: float, only_if_missing: bool
+    ):
+        args = ['SET', key, value, 'PX', max(1, int(ttl * 1000))]
+        if only_if_missing:
+            args.append('NX')
+        await self.execute(*args)
+
+    async def delete(self, *keys: str):
+        await self.execute('DEL', *keys)
+
+    async def close(self):
+        # solta a conexão antes de esperar: mesmo que a espera seja
+        # cancelada, o próximo comando abre outra
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+            with suppress(OSError):
+                await writer.wait_closed()
+
+
+def backend_from_url(url: str | None, maxsize: int) -> CacheBackend | None:
+    if not url:
+        return None
+    scheme = urlsplit(url).scheme
+    if scheme == 'memory':
+        return MemoryCache(maxsize)
+    if scheme in {'redis', 'valkey'}:
+        return RedisCache(url)
+    raise ValueError(f'Unsupported CACHE_URL scheme: {scheme!r}')
+
+
+class SingleFlight:
+    """
+    Chamadas concorrentes com a mesma chave esperam a que já está em
+    andamento em vez de repetir o trabalho. Se quem executa é cancelado
+    (cliente desconectou), os que esperavam tentam de novo.
+
+    `bind` separa execuções da mesma chave que leem de lugares diferentes:
+    uma leitura presa ao primário (sticky, depois de uma escrita) não
+    reaproveita a de uma réplica atrasada.
+
+    `calls` e `coalesced` contam, por `label`, as chamadas e quantas delas
+    reaproveitaram uma execução em andamento.
+    """
+
+    def __init__(self):
+        self.calls: Counter[str] = Counter()
+        self.coalesced: Counter[str] = Counter()
+        # chave -> bind -> execução em andamento
+        self._calls: dict[Hashable, dict[Hashable, asyncio.Future]] = {}
+
+    async def do(
+        self,
+        key: Hashable,
+        func: Callable[[], Awaitable[Any]],
+        label: str = '',
+        bind: Hashable = None,
+    ):
+        self.calls[label] += 1
+        joined = False
+        while (future := self._calls.get(key, {}).get(bind)) is not None:
+            if not joined:
+                joined = True
+                self.coalesced[label] += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls.setdefault(key, {})[bind] = future
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as error:
+            future.set_exception(error)
+            future.exception()  # ninguém esperando não é um erro
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            flights = self._calls.get(key, {})
+            if flights.get(bind) is future:
+                del flights[bind]
+                if not flights:
+                    del self._calls[key]
+
+    def forget(self, key: Hashable):
+        """
+        Chamadas seguintes não reaproveitam a execução em andamento. Usado
+        depois de uma escrita: uma leitura iniciada antes do commit não
+        serve para quem chega depois dele.
+        """
+        self._calls.pop(key, None)
+
+
+# Não é JSON válido, então não colide com nenhum valor serializado
+_GONE = b'\x00gone'
+
+
+class SharedCache:
+    """
+    Cache read-through usado pelos routers. Valores são serializados em
+    JSON; `None` nunca é cacheado. Falhas do backend viram miss: o cache
+    fora do ar só devolve a carga ao banco. Mesmo sem backend, leituras
+    concorrentes da mesma chave viram uma consulta só.
+
+    Preenchimentos de leitura usam "só se não existir", e as escritas
+    (`put`) sobrescrevem: uma leitura antiga que termina depois da escrita
+    não apaga o valor novo. Remoções (`delete`) deixam uma marca por
+    `gone_ttl` segundos pelo mesmo motivo.
+    """
+
+    def __init__(
+        self, backend: CacheBackend | None, ttl: float, gone_ttl: float = 10
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.gone_ttl = gone_ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.flight = SingleFlight()
+
+    async def get(self, key: str) -> Any:
+        if self.backend is None:
+            return None
+        try:
+            cached = await self.backend.get(key)
+        except CacheError:
+            self.errors += 1
+            return None
+        if cached is None or cached == _GONE:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return loads(cached)
+
+    async def fetch(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        bind: Hashable = None,
+    ):
+        """
+        Valor da chave ou `loader()`, uma carga por chave e `bind` (o
+        engine de onde o loader lê) por vez.
+        """
+        label = key.partition(':')[0]
+        if self.backend is None:
+            return await self.flight.do(key, loader, label, bind)
+        value = await self.get(key)
+        if value is not None:
+            return value
+        return await self.flight.do(
+            key, partial(self._fill, key, loader), label, bind
+        )
+
+    async def _fill(self, key: str, loader: Callable[[], Awaitable[Any]]):
+        value = await loader()
+        if value is not None:
+            await self._write(key, value, only_if_missing=True)
+        return value
+
+    async def put(self, key: str, value: Any, ttl: float | None = None):
+        self.flight.forget(key)
+        if self.backend is not None:
+            await self._write(key, value, only_if_missing=False, ttl=ttl)
+
+    async def delete(self, *keys: str):
+        """
+        Em vez de apagar, grava uma marca de removido. Uma leitura que
+        carregou o valor antes da remoção e preenche o cache depois dela
+        encontra a marca e não grava o valor antigo. Enquanto a marca
+        existe, as leituras vão ao banco.
+        """
+        for key in keys:
+            self.flight.forget(key)
+        if self.backend is None:
+            return
+        for key in keys:
+            try:
+                await self.backend.set(
+                    key, _GONE, self.gone_ttl, only_if_missing=False
+                )
+            except CacheError:
+                self.errors += 1
+
+    async def _write(
+        self,
+        key: str,
+        value: Any,
+        only_if_missing: bool,
+        ttl: float | None = None,
+    ):
+        try:
+            await self.backend.set(
+                key,
+                dumps(value),
+                self.ttl if ttl is None else ttl,
+                only_if_missing,
+            )
+        except CacheError:
+            self.errors += 1
+
+    async def close(self):
+        if self.backend is not None:
+            await self.backend.close()
+
+
+def user_key(user_id: int) -> str:
+    return f'user:{user_id}'
+
+
+def principal_key(email: str) -> str:
+    return f'principal:{email}'
+
+
+def todos_version_key(user_id: int) -> str:
+    return f'todos_version:{user_id}'
+
+
+def sticky_reads_key(credentials: str) -> str:
+    # hash: o token não vai para o cache
+    return f'sticky_reads:{sha256(credentials.encode()).hexdigest()[:32]}'
+
+
+def todos_page_key(user_id: int, version: int, query: str) -> str:
+    return f'todos_page:{user_id}:{version}:{query}'
+
+
+settings = Settings()
+shared_cache = SharedCache(
+    backend_from_url(settings.CACHE_URL, settings.CACHE_MAX_ENTRIES),
+    ttl=settings.CACHE_TTL_SECONDS,
+    gone_ttl=settings.CACHE_GONE_SECONDS,
+)
@@ -1,10 +1,307 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+import asyncio
+import inspect
+import time
+from contextvars import ContextVar
+from functools import partial, wraps
+from itertools import count
 
+from fastapi import Request
+from fastapi.routing import APIRoute
+from sqlalchemy import event, make_url, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from fastapi_zero.cache import TTLCache, shared_cache, sticky_reads_key
 from fastapi_zero.settings import Settings
 
-engine = create_async_engine(Settings().DATABASE_URL)
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    QueuePool que mede quanto tempo cada checkout esperou e quanto tempo
+    cada conexão ficou fora do pool (ocupação).
+    """
+
+    wait_count = 0
+    wait_seconds_total = 0.0
+    wait_seconds_max = 0.0
+    hold_count = 0
+    hold_seconds_total = 0.0
+    hold_seconds_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            self.wait_count += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        record.info['checked_out_at'] = time.perf_counter()
+        return record
+
+    def _do_return_conn(self, record):
+        checked_out_at = record.info.pop('checked_out_at', None)
+        if checked_out_at is not None:
+            held = time.perf_counter() - checked_out_at
+            self.hold_count += 1
+            self.hold_seconds_total += held
+            self.hold_seconds_max = max(self.hold_seconds_max, held)
+        super()._do_return_conn(record)
+
+
+def engine_options(settings: Settings, url: str | None = None) -> dict:
+    options = {
+        'pool_pre_ping': settings.DB_POOL_PRE_PING,
+        'query_cache_size': settings.DB_STATEMENT_CACHE_SIZE,
+    }
+    url = make_url(url or settings.DATABASE_URL)
+    if url.get_driver_name() == 'psycopg':
+        options['connect_args'] = {
+            'prepare_threshold': settings.DB_PREPARE_THRESHOLD
+        }
+    if url.get_backend_name() == 'sqlite' and url.database in {
+        None,
+        '',
+        ':memory:',
+    }:
+        # SQLite em memória usa um pool próprio, sem tamanho configurável
+        return options
+
+    per_worker = max(
+        1, settings.DB_MAX_CONNECTIONS // settings.WEB_CONCURRENCY
+    )
+    pool_size = settings.DB_POOL_SIZE or max(1, per_worker // 2)
+    max_overflow = settings.DB_MAX_OVERFLOW
+    if max_overflow is None:
+        max_overflow = max(0, per_worker - pool_size)
+
+    options.update(
+        poolclass=TimedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    return options
+
+
+def pool_status(engine: AsyncEngine) -> dict:
+    pool = engine.pool
+    if not isinstance(pool, TimedQueuePool):
+        return {}
+    return {
+        'size': pool.size(),
+        'checked_in': pool.checkedin(),
+        'checked_out': pool.checkedout(),
+        'overflow': max(0, pool.overflow()),
+        'wait_count': pool.wait_count,
+        'wait_seconds_total': pool.wait_seconds_total,
+        'wait_seconds_max': pool.wait_seconds_max,
+        'hold_count': pool.hold_count,
+        'hold_seconds_total': pool.hold_seconds_total,
+        'hold_seconds_max': pool.hold_seconds_max,
+    }
+
+
+class ReplicaSet:
+    """
+    Escolhe o engine das leituras: réplicas em round-robin, pulando as que
+    falharam há menos de `cooldown` segundos, e o primário quando nenhuma
+    está disponível ou quando o cliente escreveu há menos de
+    `sticky_seconds` (read-your-writes).
+
+    Um erro de conexão numa réplica (evento handle_error) a tira da
+    rotação na hora; `check` é o health check ativo que a devolve.
+    """
+
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        replicas: list[AsyncEngine],
+        cooldown: float,
+        sticky_seconds: float,
+    ):
+        self.primary = primary
+        self.replicas = replicas
+        self.cooldown = cooldown
+        self.sticky_seconds = sticky_seconds
+        self._down_until = dict.fromkeys(replicas, float('-inf'))
+        self._turn = count()
+        self._sticky = TTLCache(maxsize=10_000)
+        for replica in replicas:
+            event.listen(
+                replica.sync_engine,
+                'handle_error',
+                partial(self._on_error, replica),
+            )
+
+    def _on_error(self, replica: AsyncEngine, context):
+        if context.connection is None or context.is_disconnect:
+            self.mark_down(replica)
+
+    def is_replica(self, bind) -> bool:
+        return bind in self._down_until
+
+    def is_up(self, replica: AsyncEngine) -> bool:
+        return time.monotonic() >= self._down_until[replica]
+
+    def mark_down(self, replica: AsyncEngine):
+        self._down_until[replica] = time.monotonic() + self.cooldown
+
+    def mark_up(self, replica: AsyncEngine):
+        self._down_until[replica] = float('-inf')
+
+    def choose(self) -> AsyncEngine:
+        for _ in self.replicas:
+            replica = self.replicas[next(self._turn) % len(self.replicas)]
+            if self.is_up(replica):
+                return replica
+        return self.primary
+
+    async def engine_for(self, request: Request) -> AsyncEngine:
+        if not self.replicas:
+            return self.primary
+        if await self.is_sticky(request):
+            return self.primary
+        return self.choose()
+
+    async def wrote(self, request: Request):
+        """Leituras deste cliente vão ao primário por `sticky_seconds`."""
+        credentials = request.headers.get('authorization')
+        if not self.replicas or not self.sticky_seconds or not credentials:
+            return
+        key = sticky_reads_key(credentials)
+        self._sticky.set(key, True, time.time() + self.sticky_seconds)
+        # os outros workers veem a escrita pelo cache compartilhado
+        await shared_cache.put(key, True, ttl=self.sticky_seconds)
+
+    async def is_sticky(self, request: Request) -> bool:
+        credentials = request.headers.get('authorization')
+        if not credentials:
+            return False
+        key = sticky_reads_key(credentials)
+        return bool(self._sticky.get(key) or await shared_cache.get(key))
+
+    async def check(self):
+        for replica in self.replicas:
+            try:
+                async with replica.connect() as connection:
+                    await connection.execute(text('SELECT 1'))
+            except (SQLAlchemyError, OSError):
+                self.mark_down(replica)
+            else:
+                self.mark_up(replica)
+
+
+async def monitor_replicas(replicas: ReplicaSet, interval: float):
+    while True:
+        await replicas.check()
+        await asyncio.sleep(interval)
+
+
+settings = Settings()
+engine = create_async_engine(settings.DATABASE_URL, **engine_options(settings))
+replica_set = ReplicaSet(
+    engine,
+    [
+        create_async_engine(url, **engine_options(settings, url))
+        for url in settings.DATABASE_REPLICA_URLS
+    ],
+    cooldown=settings.REPLICA_COOLDOWN_SECONDS,
+    sticky_seconds=settings.REPLICA_STICKY_SECONDS,
+)
+
+SAFE_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+
+# A sessão só pega uma conexão do pool no primeiro statement; o que falta
+# é devolvê-la quando o endpoint termina, e não depois de serializar
+make_session = async_sessionmaker(expire_on_commit=False)
+request_sessions: ContextVar[list[AsyncSession] | None] = ContextVar(
+    'request_sessions', default=None
+)
+
+
+def track_session(session: AsyncSession):
+    """
+    Sessão fechada por `release_sessions` quando o endpoint retorna. Fora
+    de uma SessionRoute não faz nada: a dependência fecha no fim.
+    """
+    sessions = request_sessions.get()
+    if sessions is not None:
+        sessions.append(session)
+
+
+async def release_sessions():
+    sessions = request_sessions.get()
+    if not sessions:
+        return
+    # close, não rollback: os objetos retornados ficam desanexados com o
+    # estado já carregado, prontos para o response_model
+    for session in sessions:
+        await session.close()
+    sessions.clear()
+
+
+def _releasing_sessions(endpoint):
+    @wraps(endpoint)
+    async def call(*args, **kwargs):
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            await release_sessions()
+
+    call.releases_sessions = True
+    return call
+
+
+class SessionRoute(APIRoute):
+    """
+    Rota que devolve as conexões das sessões da requisição ao pool assim
+    que o endpoint retorna, antes da validação e serialização da resposta.
+    Commits já devolvem a conexão; o ganho é nas rotas de leitura.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        # include_router recria a rota com o endpoint já embrulhado
+        if inspect.iscoroutinefunction(endpoint) and not getattr(
+            endpoint, 'releases_sessions', False
+        ):
+            endpoint = _releasing_sessions(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request):
+            # lista própria da requisição: o contexto pode ter sido copiado
+            # de outra (tasks herdam as ContextVars de quem as criou)
+            token = request_sessions.set([])
+            try:
+                return await handler(request)
+            finally:
+                request_sessions.reset(token)
+
+        return route_handler
+
+
+async def get_session(request: Request):  # pragma: no cover
+    async with make_session(bind=engine) as session:
+        track_session(session)
+        yield session
+    if request.method not in SAFE_METHODS:
+        await replica_set.wrote(request)
 
 
-async def get_session():  # pragma: no cover
-    async with AsyncSession(engine, expire_on_commit=False) as session:
+async def get_read_session(request: Request):  # pragma: no cover
+    """Sessão para rotas só de leitura: réplica, se houver."""
+    bind = await replica_set.engine_for(request)
+    async with make_session(bind=bind) as session:
+        track_session(session)
         yield session
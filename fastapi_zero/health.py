@@ -0,0 +1,92 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / 'alembic.ini'
+
+
+def migration_head(ini: Path = ALEMBIC_INI) -> str | None:
+    """Revisão head das migrações, ou None se o alembic.ini não existir."""
+    if not ini.exists():
+        return None
+    return ScriptDirectory.from_config(Config(str(ini))).get_current_head()
+
+
+@dataclass(slots=True)
+class Readiness:
+    ready: bool
+    checks: dict[str, str] = field(default_factory=dict)
+
+
+class ReadinessProbe:
+    """
+    Verifica conexão e versão do schema, guardando o resultado por `ttl`
+    segundos. Probes concorrentes esperam a verificação em andamento, então
+    cada worker faz no máximo uma ida ao banco por intervalo.
+    """
+
+    def __init__(self, ttl: float, head: str | None):
+        self.ttl = ttl
+        self.head = head
+        self._result: Readiness | None = None
+        self._checked_at = float('-inf')
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> bool:
+        return time.monotonic() - self._checked_at < self.ttl
+
+    async def check(self, session: AsyncSession) -> Readiness:
+        if self._result is not None and self._fresh():
+            return self._result
+        async with self._lock:
+            if self._result is None or not self._fresh():
+                self._result = await self._probe(session)
+                self._checked_at = time.monotonic()
+        return self._result
+
+    async def _probe(self, session: AsyncSession) -> Readiness:
+        if self.head is None:
+            return await self._ping(session)
+        try:
+            # A própria consulta da versão já prova a conexão
+            version = await session.scalar(
+                text('SELECT version_num FROM alembic_version')
+            )
+        except SQLAlchemyError:
+            await session.rollback()
+            readiness = await self._ping(session)
+            if readiness.ready:
+                readiness.ready = False
+                readiness.checks['migrations'] = 'alembic_version not found'
+            return readiness
+
+        if version != self.head:
+            return Readiness(
+                False,
+                {
+                    'database': 'ok',
+                    'migrations': f'at {version}, expected {self.head}',
+                },
+            )
+        return Readiness(True, {'database': 'ok', 'migrations': 'ok'})
+
+    @staticmethod
+    async def _ping(session: AsyncSession) -> Readiness:
+        try:
+            await session.execute(text('SELECT 1'))
+        except SQLAlchemyError as error:
+            return Readiness(
+                False, {'database': f'error: {type(error).__name__}'}
+            )
+        return Readiness(True, {'database': 'ok'})
+
+    def reset(self):
+        self._result = None
+        self._checked_at = float('-inf')
@@ -0,0 +1,146 @@
+import time
+from collections.abc import Callable
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+@dataclass(slots=True)
+class QueryStats:
+    """Statements executados durante uma requisição."""
+
+    count: int = 0
+    total_seconds: float = 0.0
+    slowest_seconds: float = 0.0
+    slowest_statement: str | None = None
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.total_seconds += seconds
+        if seconds >= self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+
+
+@dataclass(slots=True)
+class RouteQueryMetrics:
+    requests: int = 0
+    statements: int = 0
+    db_seconds: float = 0.0
+    slowest_seconds: float = 0.0
+
+
+# O SQLAlchemy executa o driver em um greenlet que herda o contexto da
+# task, então os eventos do engine enxergam o QueryStats da requisição.
+current_stats: ContextVar[QueryStats | None] = ContextVar(
+    'current_stats', default=None
+)
+
+RequestObserver = Callable[[str, str, QueryStats], None]
+_observers: list[RequestObserver] = []
+
+
+@event.listens_for(Engine, 'before_cursor_execute', named=True)
+def _before_cursor_execute(context, **kw):
+    context.query_start = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute', named=True)
+def _after_cursor_execute(statement, context, **kw):
+    stats = current_stats.get()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - context.query_start)
+
+
+class QueryMetrics:
+    """Agregado por rota das estatísticas de SQL das requisições."""
+
+    def __init__(self):
+        self.routes: dict[tuple[str, str], RouteQueryMetrics] = {}
+
+    def __call__(self, method: str, route: str, stats: QueryStats):
+        metrics = self.routes.setdefault((method, route), RouteQueryMetrics())
+        metrics.requests += 1
+        metrics.statements += stats.count
+        metrics.db_seconds += stats.total_seconds
+        metrics.slowest_seconds = max(
+            metrics.slowest_seconds, stats.slowest_seconds
+        )
+
+    def clear(self):
+        self.routes.clear()
+
+
+def add_observer(observer: RequestObserver):
+    _observers.append(observer)
+
+
+query_metrics = QueryMetrics()
+add_observer(query_metrics)
+
+
+@contextmanager
+def observe_requests():
+    """Coleta (método, rota, QueryStats) das requisições encerradas."""
+    requests = []
+
+    def observer(method, route, stats):
+        requests.append((method, route, stats))
+
+    _observers.append(observer)
+    try:
+        yield requests
+    finally:
+        _observers.remove(observer)
+
+
+def route_template(scope) -> str:
+    # O template mantém a cardinalidade das métricas limitada
+    route = scope.get('route')
+    return getattr(route, 'path', 'unmatched')
+
+
+def debug_headers(stats: QueryStats) -> list[tuple[bytes, bytes]]:
+    return [
+        (b'x-db-query-count', str(stats.count).encode()),
+        (b'x-db-time-ms', f'{stats.total_seconds * 1000:.2f}'.encode()),
+        (b'x-db-slowest-ms', f'{stats.slowest_seconds * 1000:.2f}'.encode()),
+    ]
+
+
+class QueryStatsMiddleware:
+    """
+    Conta os statements SQL de cada requisição. Com debug=True o resultado
+    também vai nos headers X-DB-* da resposta.
+    """
+
+    def __init__(self, app, debug: bool = False):
+        self.app = app
+        self.debug = debug
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = current_stats.set(stats)
+
+        async def send_with_headers(message):
+            if self.debug and message['type'] == 'http.response.start':
+                message['headers'] = [
+                    *message.get('headers', []),
+                    *debug_headers(stats),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            current_stats.reset(token)
+            route = route_template(scope)
+            for observer in list(_observers):
+                observer(scope['method'], route, stats)
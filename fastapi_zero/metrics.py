@@ -0,0 +1,283 @@
+"""
+Métricas no formato texto do Prometheus, sem dependência externa.
+
+Os valores ficam em memória no processo; com vários workers cada um expõe
+as suas e o Prometheus soma por instância.
+"""
+
+import asyncio
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+
+from fastapi_zero.cache import shared_cache
+from fastapi_zero.database import engine, pool_status, replica_set
+from fastapi_zero.instrumentation import add_observer, route_template
+from fastapi_zero.security import hashing_pool, principal_cache
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)  # fmt: skip
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def _format_labels(labels: Labels, extra: str = '') -> str:
+    parts = [f'{name}="{value}"' for name, value in labels]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.values: dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = tuple(labels.items())
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def set(self, value: float, **labels: str):
+        """
+        Em um Counter, só para copiar um total que já é acumulado em outro
+        lugar (pool, caches), a partir de um collector.
+        """
+        self.values[tuple(labels.items())] = value
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self.values.items():
+            yield f'{self.name}{_format_labels(labels)} {_format_value(value)}'
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        # labels -> [contagem por bucket..., soma, total]
+        self.values: dict[Labels, list[float]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(labels.items())
+        series = self.values.get(key)
+        if series is None:
+            series = self.values[key] = [0] * (len(self.buckets) + 2)
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def samples(self) -> Iterable[str]:
+        for labels, series in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series, strict=False):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield (
+                    f'{self.name}_bucket{_format_labels(labels, le)} '
+                    f'{cumulative}'
+                )
+            inf = _format_labels(labels, 'le="+Inf"')
+            yield f'{self.name}_bucket{inf} {series[-1]}'
+            yield f'{self.name}_sum{_format_labels(labels)} {series[-2]!r}'
+            yield f'{self.name}_count{_format_labels(labels)} {series[-1]}'
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[Counter | Histogram] = []
+        self.collectors: list[Callable[[], None]] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Função chamada antes de cada render para atualizar gauges."""
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self.collectors:
+            collector()
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+http_requests = registry.register(
+    Counter('http_requests_total', 'Requisições HTTP por rota e status.')
+)
+http_latency = registry.register(
+    Histogram(
+        'http_request_duration_seconds', 'Latência das requisições HTTP.'
+    )
+)
+http_in_flight = registry.register(
+    Gauge('http_requests_in_flight', 'Requisições HTTP em andamento.')
+)
+event_loop_lag = registry.register(
+    Gauge('event_loop_lag_seconds', 'Atraso do event loop na última medida.')
+)
+db_statements = registry.register(
+    Counter('db_statements_total', 'Statements SQL executados por rota.')
+)
+db_seconds = registry.register(
+    Counter('db_seconds_total', 'Tempo gasto no banco por rota.')
+)
+# Chaves de pool_status: valores do momento viram gauges, totais
+# acumulados viram counters *_total
+db_pool = {
+    **{
+        key: registry.register(Gauge(f'db_pool_{key}', help))
+        for key, help in {
+            'size': 'Tamanho do pool de conexões.',
+            'checked_in': 'Conexões livres no pool.',
+            'checked_out': 'Conexões em uso.',
+            'overflow': 'Conexões abertas além de pool_size.',
+            'wait_seconds_max': 'Maior espera por uma conexão.',
+            'hold_seconds_max': 'Maior tempo de uma conexão fora do pool.',
+        }.items()
+    },
+    **{
+        key: registry.register(Counter(name, help))
+        for key, (name, help) in {
+            'wait_count': ('db_pool_waits_total', 'Checkouts feitos no pool.'),
+            'wait_seconds_total': (
+                'db_pool_wait_seconds_total',
+                'Tempo total esperando por uma conexão.',
+            ),
+            'hold_count': (
+                'db_pool_holds_total',
+                'Conexões devolvidas ao pool.',
+            ),
+            'hold_seconds_total': (
+                'db_pool_hold_seconds_total',
+                'Tempo total com conexões fora do pool.',
+            ),
+        }.items()
+    },
+}
+db_replica_up = registry.register(
+    Gauge('db_replica_up', 'Réplica de leitura em rotação (1) ou não (0).')
+)
+hashing_pending = registry.register(
+    Gauge('hashing_pending', 'Hashes de senha em andamento.')
+)
+token_cache = registry.register(
+    Counter('token_cache_lookups_total', 'Consultas ao cache de tokens.')
+)
+cache_lookups = registry.register(
+    Counter('cache_lookups_total', 'Consultas ao cache compartilhado.')
+)
+coalesce_calls = registry.register(
+    Counter(
+        'read_coalescing_calls_total',
+        'Leituras que passaram pelo single-flight.',
+    )
+)
+coalesce_joined = registry.register(
+    Counter(
+        'read_coalescing_coalesced_total',
+        'Leituras que reaproveitaram uma consulta em andamento.',
+    )
+)
+coalesce_ratio = registry.register(
+    Gauge(
+        'read_coalescing_ratio',
+        'Fração das leituras atendidas sem consulta própria.',
+    )
+)
+
+
+def _record_queries(method, route, stats):
+    db_statements.inc(stats.count, method=method, route=route)
+    db_seconds.inc(stats.total_seconds, method=method, route=route)
+
+
+def _collect_state():
+    for key, value in pool_status(engine).items():
+        db_pool[key].set(value)
+    for index, replica in enumerate(replica_set.replicas):
+        db_replica_up.set(int(replica_set.is_up(replica)), replica=str(index))
+    hashing_pending.set(hashing_pool.pending)
+    token_cache.set(principal_cache.hits, result='hit')
+    token_cache.set(principal_cache.misses, result='miss')
+    cache_lookups.set(shared_cache.hits, result='hit')
+    cache_lookups.set(shared_cache.misses, result='miss')
+    cache_lookups.set(shared_cache.errors, result='error')
+    flight = shared_cache.flight
+    for kind, calls in flight.calls.items():
+        coalesced = flight.coalesced[kind]
+        coalesce_calls.set(calls, kind=kind)
+        coalesce_joined.set(coalesced, kind=kind)
+        coalesce_ratio.set(coalesced / calls, kind=kind)
+
+
+add_observer(_record_queries)
+registry.add_collector(_collect_state)
+
+
+class MetricsMiddleware:
+    """Latência, status e requisições em andamento por rota."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        method = scope['method']
+        http_in_flight.inc(method=method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_in_flight.dec(method=method)
+            route = route_template(scope)
+            http_latency.observe(elapsed, method=method, route=route)
+            http_requests.inc(method=method, route=route, status=str(status))
+
+
+async def monitor_event_loop_lag(interval: float = 1.0):
+    """Mede quanto o loop atrasa para acordar um sleep de `interval`."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        event_loop_lag.set(max(0.0, loop.time() - start - interval))
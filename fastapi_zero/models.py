@@ -1,7 +1,15 @@
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import ForeignKey, func
+from sqlalchemy import (
+    DDL,
+    ForeignKey,
+    Index,
+    event,
+    func,
+    literal_column,
+    text,
+)
 from sqlalchemy.orm import Mapped, mapped_column, registry, relationship
 
 table_registry = registry()
@@ -18,6 +26,9 @@ class TodoState(str, Enum):
 @table_registry.mapped_as_dataclass
 class User:
     __tablename__ = 'users'
+    # INSERT/UPDATE ... RETURNING já traz created_at/updated_at gerados
+    # pelo banco, sem precisar de session.refresh() depois do commit
+    __mapper_args__ = {'eager_defaults': True}
     """
      init = False -> siginifica que nao precisamos
      passar o campo quando chamarmos
@@ -33,14 +44,36 @@ class User:
     updated_at: Mapped[datetime] = mapped_column(
         init=False, default=func.now(), onupdate=func.now()
     )
+    # Incrementado a cada escrita nos todos do usuário; base do ETag de
+    # GET /todos/ e do cursor de GET /todos/changes (ver routers/todos.py)
+    todos_version: Mapped[int] = mapped_column(
+        init=False, default=0, server_default='0'
+    )
     todos: Mapped[list['Todo']] = relationship(
-        init=False, cascade='all, delete-orphan', lazy='selectin'
+        init=False, cascade='all, delete-orphan', lazy='raise'
     )
 
 
 @table_registry.mapped_as_dataclass
 class Todo:
     __tablename__ = 'todos'
+    __mapper_args__ = {'eager_defaults': True}
+    # Índices seguindo as consultas de routers/todos.py: todas filtram por
+    # user_id e paginam por id; o segundo cobre o filtro por state e o
+    # terceiro o sync incremental.
+    __table_args__ = (
+        Index('ix_todos_user_id_id', 'user_id', 'id'),
+        Index('ix_todos_user_id_state_id', 'user_id', 'state', 'id'),
+        Index('ix_todos_user_id_version_id', 'user_id', 'version', 'id'),
+        Index(
+            'ix_todos_search',
+            text(
+                "(setweight(to_tsvector('simple', title), 'A') || "
+                "setweight(to_tsvector('simple', description), 'B'))"
+            ),
+            postgresql_using='gin',
+        ).ddl_if(dialect='postgresql'),
+    )
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     title: Mapped[str]
     description: Mapped[str]
@@ -52,3 +85,83 @@ class Todo:
     updated_at: Mapped[datetime] = mapped_column(
         init=False, default=func.now(), onupdate=func.now()
     )
+    # User.todos_version da última escrita neste todo
+    version: Mapped[int] = mapped_column(
+        init=False, default=0, server_default='0'
+    )
+
+
+# Busca textual em title/description (ver fastapi_zero/search.py).
+# PostgreSQL: tsvector com peso A (title) e B (description); o índice GIN
+# ix_todos_search (em Todo.__table_args__) é sobre essa mesma expressão.
+def _tsvector(column, weight):
+    return func.setweight(
+        func.to_tsvector(literal_column("'simple'"), column),
+        literal_column(f"'{weight}'"),
+    )
+
+
+todo_search_document = _tsvector(Todo.title, 'A').op('||')(
+    _tsvector(Todo.description, 'B')
+)
+
+# SQLite: tabela FTS5 de conteúdo externo, mantida pelos triggers abaixo
+# em qualquer INSERT/UPDATE/DELETE em todos (inclusive em lote).
+TODOS_FTS_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5(
+        title, description, content='todos', content_rowid='id'
+    )""",
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_ai AFTER INSERT ON todos BEGIN
+        INSERT INTO todos_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END""",
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_ad AFTER DELETE ON todos BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_au
+    AFTER UPDATE OF title, description ON todos BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO todos_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END""",
+)
+
+for _statement in TODOS_FTS_DDL:
+    event.listen(
+        Todo.__table__,
+        'after_create',
+        DDL(_statement).execute_if(dialect='sqlite'),
+    )
+event.listen(
+    Todo.__table__,
+    'after_drop',
+    DDL('DROP TABLE IF EXISTS todos_fts').execute_if(dialect='sqlite'),
+)
+
+
+@table_registry.mapped_as_dataclass
+class TodoTombstone:
+    """Registro de um todo apagado, para o sync incremental."""
+
+    __tablename__ = 'todo_tombstones'
+    __table_args__ = (
+        Index(
+            'ix_todo_tombstones_user_id_version',
+            'user_id',
+            'version',
+            'todo_id',
+        ),
+    )
+    id: Mapped[int] = mapped_column(init=False, primary_key=True)
+    todo_id: Mapped[int]
+    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
+    version: Mapped[int]
+    deleted_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now()
+    )
@@ -0,0 +1,75 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from http import HTTPStatus
+
+from fastapi import HTTPException
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+from fastapi_zero.schemas import FilterPage
+
+
+def encode_cursor(key: int) -> str:
+    return urlsafe_b64encode(f'id:{key}'.encode()).decode()
+
+
+def _decode(cursor: str, prefix: str, size: int) -> list[int]:
+    try:
+        kind, *keys = urlsafe_b64decode(cursor.encode()).decode().split(':')
+        if kind != prefix or len(keys) != size:
+            raise ValueError(cursor)
+        return [int(key) for key in keys]
+    except (BinasciiError, UnicodeDecodeError, ValueError):
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail='Invalid cursor'
+        )
+
+
+def decode_cursor(cursor: str) -> int:
+    [key] = _decode(cursor, 'id', 1)
+    return key
+
+
+def encode_change_cursor(version: int, todo_id: int) -> str:
+    """Posição no sync: (User.todos_version, id do todo) já entregues."""
+    return urlsafe_b64encode(f'v:{version}:{todo_id}'.encode()).decode()
+
+
+def decode_change_cursor(cursor: str) -> tuple[int, int]:
+    version, todo_id = _decode(cursor, 'v', 2)
+    return version, todo_id
+
+
+def paginate(
+    query: Select, key: InstrumentedAttribute, page: FilterPage
+) -> Select:
+    """
+    Com `cursor` usa keyset (WHERE id > ultimo_id), que não fica mais lento
+    em páginas profundas. Sem cursor mantém o OFFSET/LIMIT de sempre.
+    """
+    query = query.order_by(key).limit(page.limit)
+    if page.cursor:
+        return query.where(key > decode_cursor(page.cursor))
+    return query.offset(page.offset)
+
+
+async def page_total(
+    session: AsyncSession, query: Select, page: FilterPage
+) -> int | None:
+    """
+    Total de linhas do filtro, só com `include_total`: é um COUNT à parte
+    que percorre todas as linhas filtradas, enquanto a página para no
+    LIMIT. Sem o parâmetro a listagem não paga esse custo.
+    """
+    if not page.include_total:
+        return None
+    return await session.scalar(
+        select(func.count()).select_from(query.order_by(None).subquery())
+    )
+
+
+def next_cursor(items: list, page: FilterPage) -> str | None:
+    if not items or len(items) < page.limit:
+        return None
+    return encode_cursor(items[-1].id)
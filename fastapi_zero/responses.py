@@ -0,0 +1,96 @@
+import json
+from collections.abc import Iterable
+from hashlib import sha256
+from http import HTTPStatus
+from typing import Any
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from fastapi_zero.settings import Settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+settings = Settings()
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content, ensure_ascii=False, separators=(',', ':')
+    ).encode()
+
+
+def loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse com orjson quando instalado (extra `fast-json`)."""
+
+    @staticmethod
+    def render(content: Any) -> bytes:
+        return dumps(content)
+
+
+def public_columns(model: type, schema: type[BaseModel]) -> list:
+    """Colunas do model que o schema público expõe, na ordem do schema."""
+    return [getattr(model, name) for name in schema.model_fields]
+
+
+def public_dicts(
+    objects: Iterable[Any], schema: type[BaseModel]
+) -> list[dict]:
+    """
+    Copia só os campos do schema público, sem validar de novo. Aceita tanto
+    entidades quanto as Rows de um select(*public_columns(...)).
+    """
+    fields = tuple(schema.model_fields)
+    return [{name: getattr(obj, name) for name in fields} for obj in objects]
+
+
+def trusted_response(content: dict, response: Response | None = None):
+    """
+    Com FAST_JSON_RESPONSES o conteúdo (já montado a partir do banco) vai
+    direto para o encoder, sem a validação do response_model. Sem a flag
+    devolve o dict e o FastAPI segue o caminho normal.
+
+    Headers definidos no `response` injetado pelo FastAPI são mantidos nos
+    dois caminhos.
+    """
+    if not settings.FAST_JSON_RESPONSES:
+        return content
+    headers = dict(response.headers) if response is not None else None
+    return FastJSONResponse(content, headers=headers)
+
+
+def weak_etag(*parts: Any) -> str:
+    digest = sha256(repr(parts).encode()).hexdigest()[:32]
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match usa comparação fraca: ignora o prefixo W/."""
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    tag = etag.removeprefix('W/')
+    return any(
+        candidate.strip().removeprefix('W/') == tag
+        for candidate in header.split(',')
+    )
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=HTTPStatus.NOT_MODIFIED, headers={'ETag': etag}
+    )
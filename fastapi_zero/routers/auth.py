@@ -3,24 +3,24 @@ from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from fastapi_zero.database import get_session
-from fastapi_zero.models import User
+from fastapi_zero.database import SessionRoute, get_session
 from fastapi_zero.schemas import (
     Token,
 )
 from fastapi_zero.security import (
+    Principal,
     create_access_token,
     get_current_user,
-    verify_password,
+    verify_password_async,
 )
+from fastapi_zero.statements import USER_BY_EMAIL
 
-router = APIRouter(prefix='/auth', tags=['auth'])
+router = APIRouter(prefix='/auth', tags=['auth'], route_class=SessionRoute)
 Session = Annotated[AsyncSession, Depends(get_session)]
 OAuth2Form = Annotated[OAuth2PasswordRequestForm, Depends()]
-CurrentUser = Annotated[User, Depends(get_current_user)]
+CurrentUser = Annotated[Principal, Depends(get_current_user)]
 
 
 @router.post('/token', response_model=Token)
@@ -28,15 +28,13 @@ async def login_for_access_token(
     form_data: OAuth2Form,
     session: Session,
 ):
-    user = await session.scalar(
-        select(User).where(User.email == form_data.username)
-    )
+    user = await session.scalar(USER_BY_EMAIL, {'email': form_data.username})
     if not user:
         raise HTTPException(
             status_code=HTTPStatus.UNAUTHORIZED,
             detail='Incorrect email',
         )
-    if not verify_password(form_data.password, user.password):
+    if not await verify_password_async(form_data.password, user.password):
         raise HTTPException(
             status_code=HTTPStatus.UNAUTHORIZED,
             detail='Incorrect password',
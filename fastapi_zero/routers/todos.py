@@ -1,26 +1,131 @@
+import csv
+import io
+from enum import Enum
+from functools import partial
 from http import HTTPStatus
+from operator import itemgetter
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import StreamingResponse
+from sqlalchemy import (
+    Select,
+    and_,
+    bindparam,
+    delete,
+    func,
+    insert,
+    or_,
+    select,
+    update,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from fastapi_zero.database import get_session
-from fastapi_zero.models import Todo, User
+from fastapi_zero.cache import (
+    shared_cache,
+    todos_page_key,
+    todos_version_key,
+)
+from fastapi_zero.database import (
+    SessionRoute,
+    get_read_session,
+    get_session,
+    replica_set,
+)
+from fastapi_zero.models import Todo, TodoState, TodoTombstone, User
+from fastapi_zero.pagination import (
+    decode_change_cursor,
+    encode_change_cursor,
+    next_cursor,
+    page_total,
+    paginate,
+)
+from fastapi_zero.responses import (
+    dumps,
+    etag_matches,
+    not_modified,
+    public_columns,
+    public_dicts,
+    trusted_response,
+    weak_etag,
+)
 from fastapi_zero.schemas import (
+    FilterChanges,
     FilterTodo,
     Message,
+    TodoBulkResults,
+    TodoBulkUpdate,
+    TodoChanges,
+    TodoExport,
     TodoList,
     TodoPublic,
     TodoSchema,
+    TodoSearch,
+    TodoStats,
     TodoUpdate,
 )
-from fastapi_zero.security import get_current_user
+from fastapi_zero.search import search_todos
+from fastapi_zero.security import Principal, get_current_user
+from fastapi_zero.statements import OWNED_TODO, TODOS_VERSION
 
-router = APIRouter(prefix='/todos', tags=['TODOS'])
+router = APIRouter(prefix='/todos', tags=['TODOS'], route_class=SessionRoute)
 
 Session = Annotated[AsyncSession, Depends(get_session)]
-CurrentUser = Annotated[User, Depends(get_current_user)]
+ReadSession = Annotated[AsyncSession, Depends(get_read_session)]
+CurrentUser = Annotated[Principal, Depends(get_current_user)]
+
+BULK_MAX_ITEMS = 500
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+}
+
+
+async def _touch_todos(session: AsyncSession, user_id: int) -> int:
+    """
+    Incrementa User.todos_version na mesma transação da escrita e devolve
+    o novo valor, que vai para Todo.version/TodoTombstone.version. Isso
+    invalida o ETag de GET /todos/ e ordena o sync incremental: o UPDATE
+    trava a linha do usuário, então escritas concorrentes recebem versões
+    na ordem do commit. Toda rota que altera todos precisa chamar antes do
+    commit.
+    """
+    # Sem autoflush: as alterações pendentes vão num flush só, já com a
+    # versão
+    with session.no_autoflush:
+        return await session.scalar(
+            update(User)
+            .where(User.id == user_id)
+            .values(
+                todos_version=User.todos_version + 1,
+                # não é uma alteração do usuário: mantém o updated_at
+                updated_at=User.updated_at,
+            )
+            .returning(User.todos_version)
+            .execution_options(synchronize_session=False)
+        )
+
+
+async def _commit_todos(
+    session: AsyncSession, user_id: int, version: int | None
+):
+    """
+    Commit de uma escrita em todos. Depois do commit publica a nova versão
+    no cache (write-through): as páginas cacheadas são indexadas por ela,
+    então as antigas deixam de ser lidas em todos os workers.
+    """
+    await session.commit()
+    if version is not None:
+        await shared_cache.put(todos_version_key(user_id), version)
 
 
 @router.post('/', status_code=HTTPStatus.CREATED, response_model=TodoPublic)
@@ -32,49 +137,442 @@ async def create_todo(todo: TodoSchema, session: Session, user: CurrentUser):
         user_id=user.id,
     )
 
+    db_todo.version = await _touch_todos(session, user.id)
     session.add(db_todo)
-    await session.commit()
-    await session.refresh(db_todo)
+    await _commit_todos(session, user.id, db_todo.version)
     return db_todo
 
 
+# As rotas /bulk ficam antes de /{todo_id} para não casarem com ele
+@router.post(
+    '/bulk', status_code=HTTPStatus.CREATED, response_model=TodoBulkResults
+)
+async def create_todos_bulk(
+    session: Session,
+    user: CurrentUser,
+    todos: Annotated[
+        list[TodoSchema], Body(min_length=1, max_length=BULK_MAX_ITEMS)
+    ],
+):
+    version = await _touch_todos(session, user.id)
+    # Nem o banco nem o ORM garantem que os ids saiam na ordem do VALUES:
+    # sort_by_parameter_order devolve as linhas na ordem do payload
+    db_todos = await session.scalars(
+        insert(Todo).returning(Todo, sort_by_parameter_order=True),
+        [
+            {**todo.model_dump(), 'user_id': user.id, 'version': version}
+            for todo in todos
+        ],
+    )
+    results = [
+        {'id': todo.id, 'status': HTTPStatus.CREATED, 'todo': todo}
+        for todo in db_todos
+    ]
+    await _commit_todos(session, user.id, version)
+    return {'results': results}
+
+
+@router.patch(
+    '/bulk', status_code=HTTPStatus.OK, response_model=TodoBulkResults
+)
+async def update_todos_bulk(
+    session: Session,
+    user: CurrentUser,
+    todos_update: Annotated[
+        list[TodoBulkUpdate], Body(min_length=1, max_length=BULK_MAX_ITEMS)
+    ],
+):
+    changes = {
+        item.id: item.model_dump(exclude_unset=True, exclude={'id'})
+        for item in todos_update
+    }
+    # Trava a linha do usuário antes de alterar, como em delete_todos_bulk
+    version = await _touch_todos(session, user.id)
+    # Um UPDATE em executemany por conjunto de campos alterados, no máximo
+    # um por combinação de title/description/state, em vez de um por todo
+    by_fields = {}
+    for todo_id, fields in changes.items():
+        if fields:
+            by_fields.setdefault(tuple(sorted(fields)), []).append({
+                'todo_id': todo_id,
+                **{f'new_{name}': value for name, value in fields.items()},
+            })
+    connection = await session.connection()
+    for fields, params in by_fields.items():
+        await connection.execute(
+            _bulk_update(user.id, fields, version), params
+        )
+
+    todos_db = {
+        todo.id: todo
+        for todo in await session.execute(
+            select(*public_columns(Todo, TodoPublic), Todo.version).where(
+                Todo.user_id == user.id, Todo.id.in_(changes)
+            )
+        )
+    }
+    if not any(todo.version == version for todo in todos_db.values()):
+        # nada mudou: desfaz o incremento da versão
+        await session.rollback()
+        version = None
+    await _commit_todos(session, user.id, version)
+    results = [
+        {
+            'id': todo_id,
+            'status': HTTPStatus.OK,
+            'todo': public_dicts([todos_db[todo_id]], TodoPublic)[0],
+        }
+        if todo_id in todos_db
+        else {'id': todo_id, 'status': HTTPStatus.NOT_FOUND}
+        for todo_id in changes
+    ]
+    return {'results': results}
+
+
+def _bulk_update(user_id: int, fields: tuple[str, ...], version: int):
+    """
+    UPDATE de um todo do usuário para executemany, com os valores novos em
+    new_<campo>. Só altera (e só leva a versão nova) se algum campo muda.
+    """
+    return (
+        update(Todo)
+        .where(
+            Todo.user_id == user_id,
+            Todo.id == bindparam('todo_id'),
+            or_(
+                *(
+                    getattr(Todo, name) != bindparam(f'new_{name}')
+                    for name in fields
+                )
+            ),
+        )
+        .values(
+            version=version,
+            **{name: bindparam(f'new_{name}') for name in fields},
+        )
+    )
+
+
+@router.delete(
+    '/bulk', status_code=HTTPStatus.OK, response_model=TodoBulkResults
+)
+async def delete_todos_bulk(
+    session: Session,
+    user: CurrentUser,
+    todo_ids: Annotated[
+        list[int], Body(min_length=1, max_length=BULK_MAX_ITEMS)
+    ],
+):
+    # Trava a linha do usuário antes de apagar, na mesma ordem das outras
+    # escritas: com a ordem invertida, duas requisições concorrentes podem
+    # entrar em deadlock no PostgreSQL
+    version = await _touch_todos(session, user.id)
+    deleted = set(
+        await session.scalars(
+            delete(Todo)
+            .where(Todo.user_id == user.id, Todo.id.in_(todo_ids))
+            .returning(Todo.id)
+        )
+    )
+    if not deleted:
+        # nada mudou: desfaz o incremento da versão
+        await session.rollback()
+        version = None
+    else:
+        await session.execute(
+            insert(TodoTombstone),
+            [
+                {'todo_id': todo_id, 'user_id': user.id, 'version': version}
+                for todo_id in deleted
+            ],
+        )
+    await _commit_todos(session, user.id, version)
+    results = [
+        {
+            'id': todo_id,
+            'status': HTTPStatus.OK
+            if todo_id in deleted
+            else HTTPStatus.NOT_FOUND,
+        }
+        for todo_id in dict.fromkeys(todo_ids)
+    ]
+    return {'results': results}
+
+
+def _todos_query(
+    user_id: int, filters: TodoSearch, dialect: str, ranked: bool
+) -> Select:
+    # Só as colunas de TodoPublic: Rows leves, sem identity map
+    query = search_todos(
+        select(*public_columns(Todo, TodoPublic)).where(
+            Todo.user_id == user_id
+        ),
+        dialect,
+        title=filters.title,
+        description=filters.description,
+        ranked=ranked,
+    )
+
+    if filters.state:
+        query = query.filter(Todo.state == filters.state)
+    return query
+
+
+async def _todos_page(
+    session: AsyncSession, user_id: int, filter_todos: FilterTodo
+) -> dict:
+    # keyset pagina por id; relevância só no modo offset. Uma página
+    # ordenada por relevância não devolve cursor: o último id dela não
+    # separa o que já veio do que falta, e a próxima pularia resultados.
+    ranked = not filter_todos.cursor and bool(
+        filter_todos.title or filter_todos.description
+    )
+    query = _todos_query(
+        user_id, filter_todos, session.bind.dialect.name, ranked=ranked
+    )
+    todos = (
+        await session.execute(paginate(query, Todo.id, filter_todos))
+    ).all()
+    return {
+        'todos': public_dicts(todos, TodoPublic),
+        'next_cursor': None if ranked else next_cursor(todos, filter_todos),
+        'total': await page_total(session, query, filter_todos),
+    }
+
+
+async def _todos_page_at(
+    session: AsyncSession, user_id: int, filter_todos: FilterTodo, version: int
+) -> dict:
+    """
+    Página que vai para o cache sob `version`. A versão pode ter vindo do
+    cache, publicada pelo primário: se a réplica ainda não chegou nela, a
+    página sai do primário em vez de guardar conteúdo antigo na chave nova.
+    """
+    if replica_set.is_replica(session.bind):
+        replica_version = await session.scalar(
+            TODOS_VERSION, {'user_id': user_id}
+        )
+        if replica_version is None or replica_version < version:
+            async with AsyncSession(
+                replica_set.primary, expire_on_commit=False
+            ) as primary:
+                return await _todos_page(primary, user_id, filter_todos)
+    return await _todos_page(session, user_id, filter_todos)
+
+
+async def _todos_version(session: AsyncSession, user_id: int) -> int:
+    # A versão é lida antes dos dados: se uma escrita acontecer no meio, o
+    # ETag fica mais antigo que o conteúdo e o próximo GET recebe 200
+    return await shared_cache.fetch(
+        todos_version_key(user_id),
+        partial(session.scalar, TODOS_VERSION, {'user_id': user_id}),
+        bind=session.bind,
+    )
+
+
+async def _todos_etag(session: AsyncSession, user_id: int, *parts) -> str:
+    version = await _todos_version(session, user_id)
+    return weak_etag(*parts, user_id, version)
+
+
 @router.get('/', status_code=HTTPStatus.OK, response_model=TodoList)
 async def list_todos(
-    session: Session,
+    request: Request,
+    response: Response,
+    session: ReadSession,
     user: CurrentUser,
     filter_todos: Annotated[FilterTodo, Query()],
 ):
-    query = select(Todo).where(Todo.user_id == user.id)
+    version = await _todos_version(session, user.id)
+    etag = weak_etag('todos', request.url.query, user.id, version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers['ETag'] = etag
+
+    content = await shared_cache.fetch(
+        todos_page_key(user.id, version, request.url.query),
+        partial(_todos_page_at, session, user.id, filter_todos, version),
+        bind=session.bind,
+    )
+    return trusted_response(content, response)
+
+
+def _ndjson_chunk(rows) -> bytes:
+    return b''.join(
+        dumps(row) + b'\n' for row in public_dicts(rows, TodoPublic)
+    )
+
+
+def _csv_chunk(rows, header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(TodoPublic.model_fields)
+    writer.writerows(
+        [
+            value.value if isinstance(value, Enum) else value
+            for value in row.values()
+        ]
+        for row in public_dicts(rows, TodoPublic)
+    )
+    return buffer.getvalue()
 
-    if filter_todos.title:
-        query = query.filter(Todo.title.contains(filter_todos.title))
 
-    if filter_todos.description:
-        query = query.filter(
-            Todo.description.contains(filter_todos.description)
+async def _export_rows(bind, query: Select, export_format: str):
+    """
+    Lê o resultado com cursor do lado do servidor, EXPORT_CHUNK_SIZE linhas
+    por vez: a memória não cresce com o número de todos. A sessão é própria
+    porque a do request já foi fechada quando o corpo começa a ser enviado.
+    """
+    async with AsyncSession(bind) as session:
+        result = await session.stream(
+            query.execution_options(yield_per=EXPORT_CHUNK_SIZE)
         )
+        if export_format == 'csv':
+            yield _csv_chunk([], header=True)
+        async for rows in result.partitions():
+            if export_format == 'csv':
+                yield _csv_chunk(rows)
+            else:
+                yield _ndjson_chunk(rows)
 
-    if filter_todos.state:
-        query = query.filter(Todo.state == filter_todos.state)
 
-    todos = await session.scalars(
-        query.offset(filter_todos.offset).limit(filter_todos.limit)
+@router.get(
+    '/export',
+    status_code=HTTPStatus.OK,
+    response_class=StreamingResponse,
+    responses={
+        HTTPStatus.OK: {
+            'content': {'application/x-ndjson': {}, 'text/csv': {}},
+        }
+    },
+)
+async def export_todos(
+    session: ReadSession,
+    user: CurrentUser,
+    export: Annotated[TodoExport, Query()],
+):
+    query = _todos_query(
+        user.id, export, session.bind.dialect.name, ranked=False
+    ).order_by(Todo.id)
+    media_type, extension = EXPORT_FORMATS[export.format]
+    return StreamingResponse(
+        _export_rows(session.bind, query, export.format),
+        media_type=media_type,
+        headers={
+            'Content-Disposition': f'attachment; filename="todos.{extension}"'
+        },
+    )
+
+
+def _after(version_column, id_column, position: tuple[int, int]):
+    version, key = position
+    return or_(
+        version_column > version,
+        and_(version_column == version, id_column > key),
+    )
+
+
+@router.get('/stats', status_code=HTTPStatus.OK, response_model=TodoStats)
+async def todo_stats(
+    request: Request,
+    response: Response,
+    session: ReadSession,
+    user: CurrentUser,
+):
+    """
+    Quantidade de todos por estado num único GROUP BY, resolvido só com o
+    índice (user_id, state, id).
+    """
+    etag = await _todos_etag(session, user.id, 'stats')
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers['ETag'] = etag
+
+    rows = await session.execute(
+        select(Todo.state, func.count())
+        .where(Todo.user_id == user.id)
+        .group_by(Todo.state)
     )
-    return {'todos': todos}
+    by_state = dict.fromkeys(TodoState, 0) | dict(rows.all())
+    return {'total': sum(by_state.values()), 'by_state': by_state}
+
+
+@router.get('/changes', status_code=HTTPStatus.OK, response_model=TodoChanges)
+async def list_todo_changes(
+    session: ReadSession,
+    user: CurrentUser,
+    filter_changes: Annotated[FilterChanges, Query()],
+):
+    """
+    Todos criados/alterados e ids apagados depois de `since`, na ordem de
+    (version, id). Sem `since` começa do zero. O custo acompanha o volume
+    de mudanças, não o tamanho da lista.
+    """
+    since = (0, 0)
+    if filter_changes.since:
+        since = decode_change_cursor(filter_changes.since)
+    limit = filter_changes.limit
+
+    changed = (
+        await session.execute(
+            select(*public_columns(Todo, TodoPublic), Todo.version)
+            .where(
+                Todo.user_id == user.id, _after(Todo.version, Todo.id, since)
+            )
+            .order_by(Todo.version, Todo.id)
+            .limit(limit)
+        )
+    ).all()
+    tombstones = (
+        await session.execute(
+            select(TodoTombstone.version, TodoTombstone.todo_id)
+            .where(
+                TodoTombstone.user_id == user.id,
+                _after(TodoTombstone.version, TodoTombstone.todo_id, since),
+            )
+            .order_by(TodoTombstone.version, TodoTombstone.todo_id)
+            .limit(limit)
+        )
+    ).all()
+
+    # Junta as duas listas na ordem de (version, id) e corta no limite
+    page = sorted(
+        [((row.version, row.id), row) for row in changed]
+        + [((row.version, row.todo_id), None) for row in tombstones],
+        key=itemgetter(0),
+    )[:limit]
+    todos = [row for _, row in page if row is not None]
+    # Um id reaproveitado por um todo novo depois da remoção: vale o todo
+    alive = {todo.id for todo in todos}
+    deleted = [
+        key for (_, key), row in page if row is None and key not in alive
+    ]
+    return trusted_response({
+        'todos': public_dicts(todos, TodoPublic),
+        'deleted': deleted,
+        'next_cursor': encode_change_cursor(*(page[-1][0] if page else since)),
+        'has_more': limit in {len(changed), len(tombstones)}
+        or len(changed) + len(tombstones) > limit,
+    })
 
 
 @router.delete('/{todo_id}', status_code=HTTPStatus.OK, response_model=Message)
 async def delete_todo(session: Session, user: CurrentUser, todo_id: int):
     todo = await session.scalar(
-        select(Todo).where(Todo.user_id == user.id, Todo.id == todo_id)
+        OWNED_TODO, {'user_id': user.id, 'todo_id': todo_id}
     )
 
     if not todo:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='Task not found.'
         )
+    version = await _touch_todos(session, user.id)
     await session.delete(todo)
-    await session.commit()
+    session.add(
+        TodoTombstone(todo_id=todo.id, user_id=user.id, version=version)
+    )
+    await _commit_todos(session, user.id, version)
     return {'message': 'Task has been deleted successfuly'}
 
 
@@ -85,7 +583,7 @@ async def update_todo(
     session: Session, user: CurrentUser, todo_update: TodoUpdate, todo_id: int
 ):
     todo_db = await session.scalar(
-        select(Todo).where(Todo.user_id == user.id, Todo.id == todo_id)
+        OWNED_TODO, {'user_id': user.id, 'todo_id': todo_id}
     )
 
     if not todo_db:
@@ -96,7 +594,8 @@ async def update_todo(
     for key, value in todo_update.model_dump(exclude_unset=True).items():
         setattr(todo_db, key, value)
 
-    session.add(todo_db)
-    await session.commit()
-    await session.refresh(todo_db)
+    version = None
+    if session.is_modified(todo_db):
+        version = todo_db.version = await _touch_todos(session, user.id)
+    await _commit_todos(session, user.id, version)
     return todo_db
@@ -1,13 +1,46 @@
+import re
+from functools import partial
 from http import HTTPStatus
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from sqlalchemy import delete, select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
-from fastapi_zero.database import get_session
-from fastapi_zero.models import User
+from fastapi_zero.cache import (
+    principal_key,
+    shared_cache,
+    todos_version_key,
+    user_key,
+)
+from fastapi_zero.database import (
+    SessionRoute,
+    get_read_session,
+    get_session,
+)
+from fastapi_zero.models import TodoTombstone, User
+from fastapi_zero.pagination import (
+    next_cursor,
+    page_total,
+    paginate,
+)
+from fastapi_zero.responses import (
+    etag_matches,
+    not_modified,
+    public_columns,
+    public_dicts,
+    trusted_response,
+    weak_etag,
+)
 from fastapi_zero.schemas import (
     FilterPage,
     Message,
@@ -15,67 +48,115 @@ from fastapi_zero.schemas import (
     UserPublic,
     UserSchema,
 )
-from fastapi_zero.security import get_current_user, get_passaword_hash
+from fastapi_zero.security import (
+    Principal,
+    get_current_user,
+    get_password_hash_async,
+    invalidate_user_tokens,
+)
 
-router = APIRouter(prefix='/users', tags=['users'])
+router = APIRouter(prefix='/users', tags=['users'], route_class=SessionRoute)
 Session = Annotated[AsyncSession, Depends(get_session)]
-CurrentUser = Annotated[User, Depends(get_current_user)]
+ReadSession = Annotated[AsyncSession, Depends(get_read_session)]
+CurrentUser = Annotated[Principal, Depends(get_current_user)]
 
 
-@router.post('/', status_code=HTTPStatus.CREATED, response_model=UserPublic)
-async def create_user(user: UserSchema, session: Session):
-    # Verificar se username já existe
-    user_db_username = await session.scalar(
-        select(User).where(User.username == user.username)
+_CONFLICT_DETAILS = {
+    'username': 'Username already exists!',
+    'email': 'Email already exists!',
+}
+_SQLITE_UNIQUE = re.compile(r'UNIQUE constraint failed: users\.(\w+)')
+
+
+def _conflict_column(error: IntegrityError) -> str | None:
+    # PostgreSQL (psycopg): nome da constraint, ex.: users_email_key. A
+    # mensagem traz o valor duplicado no DETAIL e não serve para comparar.
+    constraint = getattr(
+        getattr(error.orig, 'diag', None), 'constraint_name', None
     )
-    if user_db_username:
-        raise HTTPException(
-            status_code=HTTPStatus.CONFLICT, detail='Username already exists!'
-        )
+    if constraint:
+        return constraint.removeprefix('users_').removesuffix('_key')
+    # SQLite: "UNIQUE constraint failed: users.username"
+    match = _SQLITE_UNIQUE.search(str(error.orig))
+    return match.group(1) if match else None
+
 
-    # Verificar se email já existe
-    user_db_email = await session.scalar(
-        select(User).where(User.email == user.email)
+def conflict_detail(error: IntegrityError) -> str:
+    return _CONFLICT_DETAILS.get(
+        _conflict_column(error), 'Username or email already exists!'
     )
-    if user_db_email:
-        raise HTTPException(
-            status_code=HTTPStatus.CONFLICT, detail='Email already exists!'
-        )
 
-    # Criar novo usuário
+
+@router.post('/', status_code=HTTPStatus.CREATED, response_model=UserPublic)
+async def create_user(user: UserSchema, session: Session):
+    # Insere direto e deixa as constraints unique de User decidirem:
+    # um round trip só e sem corrida entre cadastros simultâneos
     user_db = User(
         username=user.username,
         email=user.email,
-        password=get_passaword_hash(user.password),
+        password=await get_password_hash_async(user.password),
     )
     session.add(user_db)
-    await session.commit()
-    await session.refresh(user_db)
+    try:
+        await session.commit()
+    except IntegrityError as error:
+        await session.rollback()
+        raise HTTPException(
+            status_code=HTTPStatus.CONFLICT, detail=conflict_detail(error)
+        )
     return user_db
 
 
 @router.get('/', status_code=HTTPStatus.OK, response_model=UserList)
 async def read_users(
-    session: Session,
+    session: ReadSession,
     current_user: CurrentUser,
     filter_users: Annotated[FilterPage, Query()],
 ):
-    users = await session.scalars(
-        select(User).limit(filter_users.limit).offset(filter_users.offset)
-    )
-    return {'users': users}
+    # Só as colunas de UserPublic: sem hash de senha, sem identity map
+    query = select(*public_columns(User, UserPublic))
+    users = (
+        await session.execute(paginate(query, User.id, filter_users))
+    ).all()
+    return trusted_response({
+        'users': public_dicts(users, UserPublic),
+        'next_cursor': next_cursor(users, filter_users),
+        'total': await page_total(session, query, filter_users),
+    })
+
+
+async def _load_user(session: AsyncSession, user_id: int) -> dict | None:
+    row = (
+        await session.execute(
+            select(*public_columns(User, UserPublic)).where(User.id == user_id)
+        )
+    ).first()
+    return row._asdict() if row else None
 
 
 @router.get(
     '/{user_id}/', status_code=HTTPStatus.OK, response_model=UserPublic
 )
-async def read_user_for_id(user_id: int, session: Session):
-    user_db = await session.scalar(select(User).where(User.id == user_id))
-    if not user_db:
+async def read_user_for_id(
+    user_id: int, request: Request, response: Response, session: ReadSession
+):
+    user = await shared_cache.fetch(
+        user_key(user_id),
+        partial(_load_user, session, user_id),
+        bind=session.bind,
+    )
+    if not user:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='User not found!'
         )
-    return user_db
+
+    # ETag do próprio conteúdo público: a consulta é a mesma, mas o 304
+    # economiza a serialização e a banda
+    etag = weak_etag('user', *user.values())
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers['ETag'] = etag
+    return user
 
 
 @router.put(
@@ -91,19 +172,27 @@ async def update_user(
         raise HTTPException(
             status_code=HTTPStatus.FORBIDDEN, detail='Not Enough permissions'
         )
+    user_db = await session.get(User, current_user.id)
     try:
-        current_user.username = user.username
-        current_user.email = user.email
-        current_user.password = get_passaword_hash(user.password)
+        user_db.username = user.username
+        user_db.email = user.email
+        user_db.password = await get_password_hash_async(user.password)
         await session.commit()
-        await session.refresh(current_user)
-        return current_user
     except IntegrityError:
         raise HTTPException(
             detail='Username or email already exists!',
             status_code=HTTPStatus.CONFLICT,
         )
 
+    invalidate_user_tokens(user_db.id)
+    # Write-through: os outros workers leem o valor novo, e o e-mail antigo
+    # deixa de autenticar
+    await shared_cache.delete(principal_key(current_user.email))
+    await shared_cache.put(
+        user_key(user_db.id), UserPublic.model_validate(user_db).model_dump()
+    )
+    return user_db
+
 
 @router.delete(
     '/{user_id}/', status_code=HTTPStatus.OK, response_model=Message
@@ -117,6 +206,19 @@ async def delete_user(
         raise HTTPException(
             detail='Not enough permission!', status_code=HTTPStatus.FORBIDDEN
         )
-    await session.delete(current_user)
+    # O cascade precisa dos todos na sessão: carregamento explícito aqui
+    user_db = await session.get(
+        User, current_user.id, options=[selectinload(User.todos)]
+    )
+    await session.delete(user_db)
+    await session.execute(
+        delete(TodoTombstone).where(TodoTombstone.user_id == current_user.id)
+    )
     await session.commit()
+    invalidate_user_tokens(current_user.id)
+    await shared_cache.delete(
+        user_key(current_user.id),
+        principal_key(current_user.email),
+        todos_version_key(current_user.id),
+    )
     return {'message': 'User Deleted!'}
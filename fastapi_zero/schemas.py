@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import BaseModel, ConfigDict, EmailStr, Field
 
 from fastapi_zero.models import TodoState
@@ -7,6 +9,11 @@ class Message(BaseModel):
     message: str
 
 
+class ReadinessPublic(BaseModel):
+    ready: bool
+    checks: dict[str, str]
+
+
 class UserSchema(BaseModel):
     username: str
     email: EmailStr
@@ -22,6 +29,9 @@ class UserPublic(BaseModel):
 
 class UserList(BaseModel):
     users: list[UserPublic]
+    next_cursor: str | None = None
+    # Só com include_total=true
+    total: int | None = None
 
 
 class UserDB(UserSchema):
@@ -36,14 +46,25 @@ class Token(BaseModel):
 class FilterPage(BaseModel):
     offset: int = Field(ge=0, default=0)
     limit: int = Field(le=10, default=10)
+    cursor: str | None = None
+    # COUNT de todas as linhas do filtro; custa uma consulta a mais
+    include_total: bool = False
 
 
-class FilterTodo(FilterPage):
+class TodoSearch(BaseModel):
     title: str | None = Field(default=None, min_length=3, max_length=20)
     description: str | None = None
     state: TodoState | None = None
 
 
+class FilterTodo(FilterPage, TodoSearch):
+    pass
+
+
+class TodoExport(TodoSearch):
+    format: Literal['ndjson', 'csv'] = 'ndjson'
+
+
 class TodoSchema(BaseModel):
     title: str
     description: str
@@ -56,9 +77,43 @@ class TodoPublic(TodoSchema):
 
 class TodoList(BaseModel):
     todos: list[TodoPublic]
+    next_cursor: str | None = None
+    # Só com include_total=true
+    total: int | None = None
+
+
+class TodoStats(BaseModel):
+    total: int
+    by_state: dict[TodoState, int]
+
+
+class FilterChanges(BaseModel):
+    since: str | None = None
+    limit: int = Field(gt=0, le=500, default=100)
+
+
+class TodoChanges(BaseModel):
+    todos: list[TodoPublic]
+    deleted: list[int]
+    next_cursor: str
+    has_more: bool
 
 
 class TodoUpdate(BaseModel):
     title: str = None
     description: str = None
     state: TodoState = None
+
+
+class TodoBulkUpdate(TodoUpdate):
+    id: int
+
+
+class TodoBulkResult(BaseModel):
+    id: int
+    status: int
+    todo: TodoPublic | None = None
+
+
+class TodoBulkResults(BaseModel):
+    results: list[TodoBulkResult]
@@ -0,0 +1,77 @@
+import re
+
+from sqlalchemy import Select, column, func, literal_column, select, table
+
+from fastapi_zero.models import Todo, todo_search_document
+
+todos_fts = table('todos_fts', column('rowid'), column('rank'))
+
+_WORD = re.compile(r'\w+')
+_PG_WEIGHTS = {'title': 'A', 'description': 'B'}
+
+
+def _fts5_match(terms: dict[str, list[str]]) -> str:
+    # title : ("com"* AND "lei"*) AND description : ("hoj"*)
+    clauses = []
+    for name, words in terms.items():
+        phrases = ' AND '.join(f'"{word}"*' for word in words)
+        clauses.append(f'{name} : ({phrases})')
+    return ' AND '.join(clauses)
+
+
+def _tsquery(terms: dict[str, list[str]]) -> str:
+    # com:*A & lei:*A & hoj:*B
+    return ' & '.join(
+        f'{word}:*{_PG_WEIGHTS[name]}'
+        for name, words in terms.items()
+        for word in words
+    )
+
+
+def search_todos(
+    query: Select,
+    dialect: str,
+    title: str | None = None,
+    description: str | None = None,
+    ranked: bool = True,
+) -> Select:
+    """
+    Aplica os filtros de title/description usando o índice de busca
+    textual do banco (FTS5 no SQLite, tsvector + GIN no PostgreSQL), com
+    prefixo em cada palavra. Com `ranked` ordena por relevância.
+    Outros bancos, ou termos sem nenhuma palavra, continuam no LIKE.
+    """
+    terms = {}
+    for name, text in (('title', title), ('description', description)):
+        if not text:
+            continue
+        words = _WORD.findall(text.lower())
+        if words and dialect in {'sqlite', 'postgresql'}:
+            terms[name] = words
+        else:
+            query = query.where(getattr(Todo, name).contains(text))
+
+    if not terms:
+        return query
+
+    if dialect == 'sqlite':
+        # O MATCH fica numa CTE materializada para o FTS continuar sendo a
+        # tabela que conduz o join. Sem ela, no COUNT do include_total o
+        # planner passa a percorrer os todos do usuário pelo índice e a
+        # rodar o MATCH uma vez por linha.
+        matches = (
+            select(todos_fts.c.rowid, todos_fts.c.rank)
+            .where(column('todos_fts').match(_fts5_match(terms)))
+            .cte('todo_matches')
+            .prefix_with('MATERIALIZED')
+        )
+        query = query.join(matches, matches.c.rowid == Todo.id)
+        return query.order_by(matches.c.rank) if ranked else query
+
+    tsquery = func.to_tsquery(literal_column("'simple'"), _tsquery(terms))
+    query = query.where(todo_search_document.op('@@')(tsquery))
+    if ranked:
+        query = query.order_by(
+            func.ts_rank(todo_search_document, tsquery).desc()
+        )
+    return query
@@ -1,4 +1,14 @@
+import asyncio
+import os
+import time
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from functools import partial
 from http import HTTPStatus
 from zoneinfo import ZoneInfo
 
@@ -6,18 +16,61 @@ from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jwt import DecodeError, ExpiredSignatureError, decode, encode
 from pwdlib import PasswordHash
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from fastapi_zero.cache import TTLCache, principal_key, shared_cache
 from fastapi_zero.database import get_session
-from fastapi_zero.models import User
 from fastapi_zero.settings import Settings
+from fastapi_zero.statements import PRINCIPAL_BY_EMAIL
 
 settings = Settings()
 
 
 pwd_context = PasswordHash.recommended()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='/auth/token')
+principal_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE)
+
+
+class TokenInvalidations:
+    """
+    Geração em que cada usuário teve os tokens invalidados. A consulta do
+    principal anota a geração atual antes de ir ao banco e só grava no
+    principal_cache se o usuário não foi invalidado depois disso: uma
+    consulta que leu a linha antes do commit de update/delete e termina
+    depois da invalidação não volta a cachear o principal antigo.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.generation = 0
+        self.ttl = ttl
+        # basta cobrir consultas em andamento; depois do TTL do cache de
+        # tokens nenhuma delas ainda pode gravar
+        self._invalidated = TTLCache(maxsize=maxsize)
+
+    def invalidate(self, user_id: int):
+        self.generation += 1
+        self._invalidated.set(user_id, self.generation, time.time() + self.ttl)
+
+    def invalidated_since(self, user_id: int, generation: int) -> bool:
+        return self._invalidated.get(user_id, 0) > generation
+
+
+token_invalidations = TokenInvalidations(
+    maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL_SECONDS
+)
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """
+    Usuário autenticado com apenas as colunas usadas na autorização.
+    Não é um objeto do ORM: nada de todos ou senha carregados a cada
+    request. Endpoints que precisam do User completo carregam explicitamente.
+    """
+
+    id: int
+    email: str
+    username: str
 
 
 def get_passaword_hash(password: str):
@@ -28,6 +81,69 @@ def verify_password(plain_password: str, hashed_password: str):
     return pwd_context.verify(plain_password, hashed_password)
 
 
+class HashingPool:
+    """
+    Executa o hash/verify do Argon2 em threads (ou processos) para não
+    travar o event loop. Quando há mais de `max_pending` tarefas em
+    andamento responde 429 em vez de enfileirar sem limite.
+    """
+
+    def __init__(self, kind: str, workers: int | None, max_pending: int):
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor: Executor | None = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            executor_class = (
+                ProcessPoolExecutor
+                if self.kind == 'process'
+                else ThreadPoolExecutor
+            )
+            self._executor = executor_class(max_workers=self.workers)
+        return self._executor
+
+    async def run(self, func, *args):
+        if self.pending >= self.max_pending:
+            raise HTTPException(
+                status_code=HTTPStatus.TOO_MANY_REQUESTS,
+                detail='Too many requests, try again later',
+                headers={'Retry-After': '1'},
+            )
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_executor(), func, *args
+            )
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+hashing_pool = HashingPool(
+    kind=settings.HASH_EXECUTOR,
+    workers=settings.HASH_WORKERS,
+    max_pending=settings.HASH_MAX_PENDING,
+)
+
+
+async def get_password_hash_async(password: str):
+    return await hashing_pool.run(get_passaword_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str):
+    return await hashing_pool.run(
+        verify_password, plain_password, hashed_password
+    )
+
+
 def create_access_token(data: dict):
     # data = {sub: 'email', ...(claims)}
     to_encode = data.copy()
@@ -43,10 +159,27 @@ def create_access_token(data: dict):
     return encode_jwt
 
 
+async def _load_principal(session: AsyncSession, email: str) -> list | None:
+    row = (
+        await session.execute(PRINCIPAL_BY_EMAIL, {'email': email})
+    ).one_or_none()
+    # Encerra a transação só de leitura e devolve a conexão ao pool: nas
+    # rotas de leitura a sessão do endpoint é outra, e a requisição
+    # seguraria duas conexões até o fim
+    await session.commit()
+    return list(row) if row else None
+
+
 async def get_current_user(
     session: AsyncSession = Depends(get_session),
     token: str = Depends(oauth2_scheme),
 ):
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+    # anotada antes de ir ao banco (ver TokenInvalidations)
+    generation = token_invalidations.generation
+
     credentials_exception = HTTPException(
         status_code=HTTPStatus.UNAUTHORIZED,
         detail='Could not validate credentials',
@@ -56,19 +189,35 @@ async def get_current_user(
         payload = decode(
             token, settings.SECRET_KEY, algorithms=settings.ALGORITHM
         )
-        subject_email = payload.get('sub')
-        if not subject_email:
-            raise credentials_exception
-
-        user = await session.scalar(
-            select(User).where(User.email == subject_email)
-        )
-        if not user:
-            raise credentials_exception
-        return user
-
     except DecodeError:
         raise credentials_exception
 
     except ExpiredSignatureError:
         raise credentials_exception
+
+    subject_email = payload.get('sub')
+    if not subject_email:
+        raise credentials_exception
+
+    row = await shared_cache.fetch(
+        principal_key(subject_email),
+        partial(_load_principal, session, subject_email),
+        bind=session.bind,
+    )
+    if not row:
+        raise credentials_exception
+
+    principal = Principal(*row)
+    if 'exp' in payload and not token_invalidations.invalidated_since(
+        principal.id, generation
+    ):
+        expires_at = min(
+            payload['exp'], time.time() + settings.TOKEN_CACHE_TTL_SECONDS
+        )
+        principal_cache.set(token, principal, expires_at)
+    return principal
+
+
+def invalidate_user_tokens(user_id: int):
+    token_invalidations.invalidate(user_id)
+    principal_cache.discard_where(lambda principal: principal.id == user_id)
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -11,3 +13,63 @@ class Settings(BaseSettings):
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     APP_PORT: int
+
+    # Expõe contagem/tempo de SQL de cada requisição nos headers X-DB-*
+    DEBUG: bool = False
+    # Intervalo da medida de atraso do event loop exposta em /metrics
+    EVENT_LOOP_LAG_INTERVAL: float = 1.0
+
+    # /readyz guarda o resultado por este tempo: no máximo uma consulta ao
+    # banco por intervalo em cada worker, qualquer que seja a frequência
+    READINESS_CACHE_SECONDS: float = 5.0
+
+    # Listagens serializadas direto do banco (orjson, se instalado), sem
+    # revalidar pelo response_model
+    FAST_JSON_RESPONSES: bool = False
+
+    # Pool que executa o Argon2 fora do event loop
+    HASH_EXECUTOR: Literal['thread', 'process'] = 'thread'
+    HASH_WORKERS: int | None = None  # None -> os.cpu_count()
+    HASH_MAX_PENDING: int = 64
+
+    # Cache de tokens já verificados em get_current_user. O TTL limita por
+    # quanto tempo outro worker pode servir um usuário alterado/removido.
+    TOKEN_CACHE_SIZE: int = 10_000
+    TOKEN_CACHE_TTL_SECONDS: int = 60
+
+    # Cache compartilhado de usuários e páginas de todos. redis://host:6379/0
+    # usa Redis (ou compatível) e vale para todos os workers; memory://
+    # guarda no processo e só é coerente com WEB_CONCURRENCY=1. Sem valor,
+    # tudo vai direto ao banco.
+    CACHE_URL: str | None = None
+    CACHE_TTL_SECONDS: float = 30
+    CACHE_MAX_ENTRIES: int = 10_000
+    # Chaves removidas ficam marcadas por este tempo, para que uma leitura
+    # iniciada antes da remoção não volte a gravar o valor antigo
+    CACHE_GONE_SECONDS: float = 10
+
+    # Réplicas de leitura (lista JSON no .env). As rotas só de leitura usam
+    # as réplicas em round-robin; escritas e autenticação ficam no primário.
+    # Depois de uma escrita, as leituras com o mesmo token vão ao primário
+    # por REPLICA_STICKY_SECONDS, cobrindo o atraso da replicação.
+    DATABASE_REPLICA_URLS: list[str] = []
+    REPLICA_STICKY_SECONDS: float = 5.0
+    # Réplica com erro de conexão sai da rotação por este tempo; o health
+    # check de fundo a devolve antes se voltar a responder
+    REPLICA_COOLDOWN_SECONDS: float = 30.0
+    REPLICA_HEALTH_INTERVAL: float = 5.0
+
+    # Pool de conexões, por worker. Sem DB_POOL_SIZE/DB_MAX_OVERFLOW o
+    # total DB_MAX_CONNECTIONS é dividido entre os WEB_CONCURRENCY workers.
+    WEB_CONCURRENCY: int = 1
+    DB_MAX_CONNECTIONS: int = 20
+    DB_POOL_SIZE: int | None = None
+    DB_MAX_OVERFLOW: int | None = None
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 500
+    # Com psycopg, cada conexão prepara no servidor as consultas executadas
+    # este número de vezes (0 prepara já na primeira). None desliga, o que
+    # é necessário atrás de um pgbouncer em modo transaction.
+    DB_PREPARE_THRESHOLD: int | None = 5
@@ -0,0 +1,34 @@
+"""
+Consultas executadas em quase toda requisição, montadas uma vez no import
+com bindparam. O SQLAlchemy guarda a chave de cache na própria instância,
+então cada execução só procura a versão compilada e passa os parâmetros,
+sem reconstruir o select nem recalcular a chave. O SQL é sempre o mesmo,
+e no PostgreSQL o psycopg prepara cada uma no servidor
+(DB_PREPARE_THRESHOLD).
+
+lambda_stmt daria o mesmo cache, mas pela Session do ORM refaz a cópia da
+consulta com os parâmetros a cada execução e fica mais lento que o select
+reconstruído (benchmarks/bench_statements.py).
+"""
+
+from sqlalchemy import bindparam, select
+
+from fastapi_zero.models import Todo, User
+
+# {'email': ...}
+USER_BY_EMAIL = select(User).where(User.email == bindparam('email'))
+
+# {'email': ...}
+PRINCIPAL_BY_EMAIL = select(User.id, User.email, User.username).where(
+    User.email == bindparam('email')
+)
+
+# {'user_id': ...}
+TODOS_VERSION = select(User.todos_version).where(
+    User.id == bindparam('user_id')
+)
+
+# {'user_id': ..., 'todo_id': ...}
+OWNED_TODO = select(Todo).where(
+    Todo.user_id == bindparam('user_id'), Todo.id == bindparam('todo_id')
+)
@@ -25,6 +25,14 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = table_registry.metadata
 
+
+def include_object(object, name, type_, reflected, compare_to):
+    # tabelas do FTS5 (busca textual no SQLite) são criadas via migration
+    # e mantidas por triggers, fora do metadata
+    if type_ == 'table' and name.startswith('todos_fts'):
+        return False
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -47,6 +55,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -57,7 +66,9 @@ def run_migrations_offline() -> None:
 
 def do_run_migrations(connection):
     context.configure(
-       connection=connection, target_metadata=target_metadata 
+       connection=connection,
+       target_metadata=target_metadata,
+       include_object=include_object,
     )
     
     with context.begin_transaction():
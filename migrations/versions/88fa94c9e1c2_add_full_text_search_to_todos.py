@@ -0,0 +1,81 @@
+"""add full text search to todos
+
+Revision ID: 88fa94c9e1c2
+Revises: f9542388bbe0
+Create Date: 2026-10-18 10:03:17.552940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '88fa94c9e1c2'
+down_revision: Union[str, Sequence[str], None] = 'f9542388bbe0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SQLITE_UPGRADE = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5(
+        title, description, content='todos', content_rowid='id'
+    )""",
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_ai AFTER INSERT ON todos BEGIN
+        INSERT INTO todos_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END""",
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_ad AFTER DELETE ON todos BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_au
+    AFTER UPDATE OF title, description ON todos BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO todos_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END""",
+    # indexa os todos que já existem
+    "INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')",
+)
+
+SQLITE_DOWNGRADE = (
+    'DROP TRIGGER IF EXISTS todos_fts_au',
+    'DROP TRIGGER IF EXISTS todos_fts_ad',
+    'DROP TRIGGER IF EXISTS todos_fts_ai',
+    'DROP TABLE IF EXISTS todos_fts',
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+    elif dialect == 'postgresql':
+        op.create_index(
+            'ix_todos_search',
+            'todos',
+            [sa.text(
+                "(setweight(to_tsvector('simple', title), 'A') || "
+                "setweight(to_tsvector('simple', description), 'B'))"
+            )],
+            postgresql_using='gin',
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_DOWNGRADE:
+            op.execute(statement)
+    elif dialect == 'postgresql':
+        op.drop_index('ix_todos_search', table_name='todos')
@@ -11,9 +11,11 @@ from sqlalchemy.orm import Session
 from sqlalchemy.pool import StaticPool
 
 from fastapi_zero.app import app
-from fastapi_zero.database import get_session
+from fastapi_zero.cache import MemoryCache, shared_cache
+from fastapi_zero.database import get_read_session, get_session
+from fastapi_zero.instrumentation import observe_requests
 from fastapi_zero.models import User, table_registry
-from fastapi_zero.security import get_passaword_hash
+from fastapi_zero.security import get_passaword_hash, principal_cache
 from fastapi_zero.settings import Settings
 
 
@@ -24,8 +26,10 @@ def client(session: Session):
 
     with TestClient(app) as client:
         app.dependency_overrides[get_session] = get_session_override
+        app.dependency_overrides[get_read_session] = get_session_override
         yield client
     app.dependency_overrides.clear()
+    principal_cache.clear()
 
 
 @pytest_asyncio.fixture
@@ -47,6 +51,14 @@ async def session():
         await conn.run_sync(table_registry.metadata.drop_all)
 
 
+@pytest.fixture
+def cache(monkeypatch):
+    """Liga o cache compartilhado com o backend em memória."""
+    backend = MemoryCache(maxsize=1000)
+    monkeypatch.setattr(shared_cache, 'backend', backend)
+    return backend
+
+
 @contextmanager
 def _mock_db_time(model, time=datetime(2025, 5, 20)):
     def fake_time_hook(mapper, connection, target):
@@ -64,6 +76,41 @@ def mock_db_time():
     return _mock_db_time
 
 
+@contextmanager
+def _count_queries(session):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = session.bind.sync_engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    yield statements
+    event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@pytest.fixture
+def count_queries(session):
+    return lambda: _count_queries(session)
+
+
+@contextmanager
+def _query_budget(budget):
+    with observe_requests() as requests:
+        yield requests
+    assert requests, 'no request finished inside the budget block'
+    for method, route, stats in requests:
+        assert stats.count <= budget, (
+            f'{method} {route} issued {stats.count} statements, '
+            f'budget is {budget}'
+        )
+
+
+@pytest.fixture
+def query_budget():
+    return _query_budget
+
+
 # @pytest_asyncio.fixture
 # async def users(session: AsyncSession):
 #     password0 = 'senha-do-teste0'
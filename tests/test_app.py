@@ -1,8 +1,12 @@
 from http import HTTPStatus
 
+import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import text
 
 from fastapi_zero.app import app
+from fastapi_zero.app import readiness_probe as app_readiness_probe
+from fastapi_zero.health import ReadinessProbe, migration_head
 
 
 def test_root_deve_retornar_ola_mundo(client):
@@ -49,3 +53,87 @@ def test_healthcheck(client):
     # assert
     assert response.json() == {'message': 'Health - OK'}
     assert response.status_code == HTTPStatus.OK
+
+
+@pytest.fixture
+def readiness_probe():
+    app_readiness_probe.reset()
+    yield app_readiness_probe
+    app_readiness_probe.reset()
+
+
+async def _stamp(session, version):
+    await session.execute(
+        text('CREATE TABLE alembic_version (version_num VARCHAR(32))')
+    )
+    await session.execute(
+        text('INSERT INTO alembic_version VALUES (:v)'), {'v': version}
+    )
+    await session.commit()
+
+
+def test_livez(client):
+    response = client.get('/livez')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {'message': 'alive'}
+
+
+def test_readyz_unavailable_without_migrations(client, readiness_probe):
+    response = client.get('/readyz')
+
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert response.json() == {
+        'ready': False,
+        'checks': {
+            'database': 'ok',
+            'migrations': 'alembic_version not found',
+        },
+    }
+
+
+@pytest.mark.asyncio
+async def test_readyz_unavailable_on_old_migration(
+    client, session, readiness_probe
+):
+    await _stamp(session, 'old')
+
+    response = client.get('/readyz')
+
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert response.json()['checks']['migrations'] == (
+        f'at old, expected {readiness_probe.head}'
+    )
+
+
+@pytest.mark.asyncio
+async def test_readyz_caches_result(
+    client, session, readiness_probe, count_queries
+):
+    await _stamp(session, readiness_probe.head)
+
+    with count_queries() as statements:
+        responses = [client.get('/readyz') for _ in range(5)]
+
+    assert {r.status_code for r in responses} == {HTTPStatus.OK}
+    assert responses[0].json() == {
+        'ready': True,
+        'checks': {'database': 'ok', 'migrations': 'ok'},
+    }
+    assert len(statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_readiness_probe_rechecks_after_ttl(session, count_queries):
+    probe = ReadinessProbe(ttl=0, head=None)
+
+    with count_queries() as statements:
+        await probe.check(session)
+        await probe.check(session)
+
+    expected_queries = 2
+    assert len(statements) == expected_queries
+
+
+def test_migration_head_matches_alembic_scripts():
+    assert migration_head() == '0d001bbfddf3'
@@ -0,0 +1,385 @@
+import asyncio
+import time
+from functools import partial
+
+import pytest
+import pytest_asyncio
+
+from fastapi_zero.cache import (
+    CacheError,
+    MemoryCache,
+    RedisCache,
+    SharedCache,
+    SingleFlight,
+    TTLCache,
+)
+from fastapi_zero.security import principal_cache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2)
+    expires_at = time.time() + 60
+    cache.set('a', 'A', expires_at)
+    cache.set('b', 'B', expires_at)
+    cache.get('a')
+    cache.set('c', 'C', expires_at)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 'A'
+    assert cache.get('c') == 'C'
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_ttl_cache_expired_entry_is_a_miss():
+    cache = TTLCache(maxsize=2)
+    cache.set('a', 1, time.time() - 1)
+
+    assert cache.get('a') is None
+    assert len(cache) == 0
+    assert cache.misses == 1
+
+
+class FakeRedis:
+    """Servidor RESP em memória com os comandos usados pelo RedisCache."""
+
+    def __init__(self):
+        self.data = {}
+        self.commands = []
+        self.server = None
+        # quando definido, as respostas esperam o evento
+        self.hold: asyncio.Event | None = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._serve, '127.0.0.1', 0)
+        return f'redis://127.0.0.1:{self.server.sockets[0].getsockname()[1]}'
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                args = await self._read_command(reader)
+                await self._respond(writer, args)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    async def _respond(self, writer, args):
+        self.commands.append(args)
+        if self.hold:
+            await self.hold.wait()
+        writer.write(self._reply(args))
+        await writer.drain()
+
+    @staticmethod
+    async def _read_command(reader):
+        count = int((await reader.readuntil(b'\r\n'))[1:-2])
+        args = []
+        for _ in range(count):
+            size = int((await reader.readuntil(b'\r\n'))[1:-2])
+            args.append((await reader.readexactly(size + 2))[:-2])
+        return args
+
+    def _reply(self, args):
+        command, *rest = args
+        match command.upper():
+            case b'GET':
+                value = self.data.get(rest[0])
+                if value is None:
+                    return b'$-1\r\n'
+                return b'$%d\r\n%s\r\n' % (len(value), value)
+            case b'SET':
+                if b'NX' in rest[2:] and rest[0] in self.data:
+                    return b'$-1\r\n'
+                self.data[rest[0]] = rest[1]
+                return b'+OK\r\n'
+            case b'DEL':
+                removed = sum(
+                    self.data.pop(key, None) is not None for key in rest
+                )
+                return b':%d\r\n' % removed
+        return b'-ERR unknown command\r\n'
+
+
+@pytest_asyncio.fixture
+async def fake_redis():
+    server = FakeRedis()
+    url = await server.start()
+    yield server, url
+    await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_fill_does_not_overwrite():
+    cache = MemoryCache(maxsize=10)
+    ttl = 60
+    await cache.set('k', b'novo', ttl, only_if_missing=False)
+    await cache.set('k', b'antigo', ttl, only_if_missing=True)
+
+    assert await cache.get('k') == b'novo'
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_commands(fake_redis):
+    server, url = fake_redis
+    cache = RedisCache(url)
+    ttl = 1.5
+
+    await cache.set('k', b'v', ttl, only_if_missing=False)
+    await cache.set('k', b'outro', ttl, only_if_missing=True)
+    value = await cache.get('k')
+    await cache.delete('k')
+    missing = await cache.get('k')
+    await cache.close()
+
+    assert value == b'v'
+    assert missing is None
+    assert server.commands[0] == [b'SET', b'k', b'v', b'PX', b'1500']
+    assert server.commands[1][-1] == b'NX'
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_reconnects_after_failure(fake_redis):
+    server, url = fake_redis
+    cache = RedisCache(url)
+    await cache.get('k')
+    cache._writer.transport.abort()
+
+    with pytest.raises(CacheError):
+        await cache.get('k')
+    assert await cache.get('k') is None
+    await cache.close()
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_cancelled_command_does_not_leak_reply(fake_redis):
+    server, url = fake_redis
+    server.data = {b'a': b'A', b'b': b'B'}
+    cache = RedisCache(url)
+    server.hold = asyncio.Event()
+
+    pending = asyncio.create_task(cache.get('a'))
+    while not server.commands:
+        await asyncio.sleep(0)
+    pending.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await pending
+    server.hold.set()
+
+    assert await cache.get('b') == b'B'
+    await cache.close()
+
+
+@pytest.mark.asyncio
+async def test_shared_cache_backend_down_is_a_miss():
+    cache = SharedCache(RedisCache('redis://127.0.0.1:1'), ttl=60)
+
+    async def loader():
+        return {'id': 1}
+
+    assert await cache.fetch('user:1', loader) == {'id': 1}
+    expected_errors = 2  # GET e SET
+    assert cache.errors == expected_errors
+
+
+@pytest.mark.asyncio
+async def test_shared_cache_single_flight_loads_once():
+    cache = SharedCache(MemoryCache(maxsize=10), ttl=60)
+    calls = 0
+    concurrent = 10
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return [1, 'a@a.com', 'a']
+
+    results = await asyncio.gather(
+        *(cache.fetch('principal:a@a.com', loader) for _ in range(concurrent))
+    )
+
+    assert calls == 1
+    assert results == [[1, 'a@a.com', 'a']] * concurrent
+    assert await cache.fetch('principal:a@a.com', loader) == [
+        1,
+        'a@a.com',
+        'a',
+    ]
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_errors():
+    flight = SingleFlight()
+    calls = 0
+
+    async def failing():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError('boom')
+
+    results = await asyncio.gather(
+        flight.do('k', failing),
+        flight.do('k', failing),
+        return_exceptions=True,
+    )
+
+    assert calls == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_read_user_served_from_cache_until_update(
+    client, user, token, cache, count_queries
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    username = user.username
+    client.get(f'/users/{user.id}/')
+
+    with count_queries() as statements:
+        cached = client.get(f'/users/{user.id}/')
+    client.put(
+        f'/users/{user.id}/',
+        headers=headers,
+        json={
+            'username': 'novo',
+            'email': user.email,
+            'password': user.clean_password,
+        },
+    )
+    with count_queries() as after_update:
+        updated = client.get(f'/users/{user.id}/')
+
+    assert cached.json()['username'] == username
+    assert not statements
+    assert updated.json()['username'] == 'novo'
+    assert not after_update
+
+
+def test_list_todos_served_from_cache_until_write(
+    client, token, cache, count_queries
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    todo = {'title': 't', 'description': 'd', 'state': 'todo'}
+    client.post('/todos/', headers=headers, json=todo)
+    first = client.get('/todos/', headers=headers)
+
+    with count_queries() as statements:
+        cached = client.get('/todos/', headers=headers)
+    client.post('/todos/', headers=headers, json=todo)
+    after_write = client.get('/todos/', headers=headers)
+
+    assert not statements
+    assert cached.json() == first.json()
+    assert cached.headers['etag'] == first.headers['etag']
+    assert len(after_write.json()['todos']) == len(first.json()['todos']) + 1
+    assert after_write.headers['etag'] != first.headers['etag']
+
+
+def test_principal_shared_between_workers(client, token, cache, count_queries):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/todos/stats', headers=headers)
+    # outro worker: cache de tokens local vazio, cache compartilhado quente
+    principal_cache.clear()
+
+    with count_queries() as statements:
+        client.get('/todos/stats', headers=headers)
+
+    assert len(statements) == 1
+    assert 'GROUP BY' in statements[0]
+
+
+@pytest.mark.asyncio
+async def test_reads_coalesce_without_backend():
+    cache = SharedCache(None, ttl=60)
+    calls = 0
+    concurrent = 5
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {'id': 1}
+
+    results = await asyncio.gather(
+        *(cache.fetch('user:1', loader) for _ in range(concurrent))
+    )
+
+    assert calls == 1
+    assert results == [{'id': 1}] * concurrent
+    assert cache.flight.calls['user'] == concurrent
+    assert cache.flight.coalesced['user'] == concurrent - 1
+
+
+@pytest.mark.asyncio
+async def test_reads_on_other_bind_do_not_coalesce():
+    cache = SharedCache(None, ttl=60)
+    loaded = []
+
+    async def loader(bind):
+        loaded.append(bind)
+        await asyncio.sleep(0.01)
+        return {'bind': bind}
+
+    # a leitura sticky vai ao primário e não espera a da réplica
+    results = await asyncio.gather(
+        cache.fetch('user:1', partial(loader, 'replica'), bind='replica'),
+        cache.fetch('user:1', partial(loader, 'replica'), bind='replica'),
+        cache.fetch('user:1', partial(loader, 'primary'), bind='primary'),
+    )
+
+    assert sorted(loaded) == ['primary', 'replica']
+    assert results == [
+        {'bind': 'replica'},
+        {'bind': 'replica'},
+        {'bind': 'primary'},
+    ]
+    assert not cache.flight._calls
+
+
+@pytest.mark.asyncio
+async def test_read_after_write_does_not_join_older_read():
+    cache = SharedCache(None, ttl=60)
+    release = asyncio.Event()
+    old_version, new_version = 1, 2
+    versions = iter([old_version, new_version])
+
+    async def loader():
+        version = next(versions)
+        await release.wait()
+        return version
+
+    before_write = asyncio.create_task(cache.fetch('todos_version:1', loader))
+    await asyncio.sleep(0)
+    await cache.put('todos_version:1', new_version)
+    after_write = asyncio.create_task(cache.fetch('todos_version:1', loader))
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await before_write == old_version
+    assert await after_write == new_version
+
+
+@pytest.mark.asyncio
+async def test_fill_started_before_delete_does_not_restore_value():
+    cache = SharedCache(MemoryCache(maxsize=10), ttl=60)
+    release = asyncio.Event()
+
+    async def loader():
+        await release.wait()
+        return {'id': 1}
+
+    before_delete = asyncio.create_task(cache.fetch('user:1', loader))
+    await asyncio.sleep(0)
+    await cache.delete('user:1')
+    release.set()
+    await before_delete
+
+    assert await cache.get('user:1') is None
+    assert await cache.fetch('user:1', loader) == {'id': 1}
+    assert await cache.get('user:1') is None
+
+    await cache.put('user:1', {'id': 1})
+
+    assert await cache.get('user:1') == {'id': 1}
@@ -1,10 +1,31 @@
+import os
 from dataclasses import asdict
+from typing import Annotated
+from uuid import uuid4
 
 import pytest
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, FastAPI, Request
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from pydantic import BaseModel, field_validator
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import selectinload
 
-from fastapi_zero.models import Todo, User
+from fastapi_zero.database import (
+    ReplicaSet,
+    SessionRoute,
+    TimedQueuePool,
+    engine_options,
+    pool_status,
+    track_session,
+)
+from fastapi_zero.models import Todo, TodoState, User, table_registry
+from fastapi_zero.pagination import encode_cursor, paginate
+from fastapi_zero.routers import todos as todos_router
+from fastapi_zero.schemas import FilterPage, FilterTodo
+from fastapi_zero.statements import OWNED_TODO, PRINCIPAL_BY_EMAIL
 
 
 @pytest.mark.asyncio
@@ -16,13 +37,16 @@ async def test_create_db_user(session: AsyncSession, mock_db_time):
         session.add(new_user)
         await session.commit()
         user = await session.scalar(
-            select(User).where(User.username == 'test')
+            select(User)
+            .options(selectinload(User.todos))
+            .where(User.username == 'test')
         )
         assert asdict(user) == {
             'id': 1,
             'username': 'test',
             'email': 'test@test.com',
             'password': 'secret',
+            'todos_version': 0,
             'todos': [],
             'created_at': time,
             'updated_at': time,
@@ -48,6 +72,7 @@ async def test_create_db_todo(session: AsyncSession, mock_db_time, user):
             'created_at': time,
             'updated_at': time,
             'user_id': user.id,
+            'version': 0,
         }
 
 
@@ -72,3 +97,357 @@ async def test_enum_invalido(session: AsyncSession, user):
         await session.scalar(select(Todo).where(Todo.description == 'teste'))
 
     await session.flush()
+
+
+def _todo_queries():
+    """Consultas de routers/todos.py e o índice esperado no SQLite."""
+    owner = select(Todo).where(Todo.user_id == 1)
+    since_version, since_id = 5, 3
+    return {
+        'owner': (
+            paginate(owner, Todo.id, FilterPage()),
+            'ix_todos_user_id_id',
+        ),
+        'owner_state': (
+            paginate(
+                owner.where(Todo.state == TodoState.todo),
+                Todo.id,
+                FilterPage(),
+            ),
+            'ix_todos_user_id_state_id',
+        ),
+        'owner_id': (
+            select(Todo).where(Todo.user_id == 1, Todo.id == 1),
+            'INTEGER PRIMARY KEY',
+        ),
+        'keyset': (
+            paginate(owner, Todo.id, FilterPage(cursor=encode_cursor(10))),
+            'ix_todos_user_id_id',
+        ),
+        'changes': (
+            owner
+            .where(
+                or_(
+                    Todo.version > since_version,
+                    and_(Todo.version == since_version, Todo.id > since_id),
+                )
+            )
+            .order_by(Todo.version, Todo.id)
+            .limit(100),
+            'ix_todos_user_id_version_id',
+        ),
+        'stats': (
+            select(Todo.state, func.count())
+            .where(Todo.user_id == 1)
+            .group_by(Todo.state),
+            'COVERING INDEX ix_todos_user_id_state_id',
+        ),
+    }
+
+
+def _explain_sql(stmt, connection):
+    return str(
+        stmt.compile(
+            dialect=connection.dialect,
+            compile_kwargs={'literal_binds': True},
+        )
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('query', _todo_queries().keys())
+async def test_todo_queries_use_index_on_sqlite(session, query):
+    stmt, expected_index = _todo_queries()[query]
+    connection = await session.connection()
+    sql = _explain_sql(stmt, connection)
+
+    plan = (
+        await connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}')
+    ).all()
+    details = ' '.join(row.detail for row in plan)
+
+    assert expected_index in details
+    assert 'SCAN todos' not in details
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('cursor', [None, encode_cursor(10)])
+@pytest.mark.parametrize('count', [False, True])
+async def test_todo_search_is_driven_by_fts(session, cursor, count):
+    filters = FilterTodo(title='leite', cursor=cursor)
+    query = todos_router._todos_query(1, filters, 'sqlite', ranked=not cursor)
+    if count:
+        # o COUNT do include_total
+        stmt = select(func.count()).select_from(
+            query.order_by(None).subquery()
+        )
+    else:
+        stmt = paginate(query, Todo.id, filters)
+    connection = await session.connection()
+    sql = _explain_sql(stmt, connection)
+
+    plan = (
+        await connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}')
+    ).all()
+    details = [row.detail for row in plan]
+
+    # O MATCH roda uma vez, antes de buscar os todos; o contrário (todos
+    # do usuário pelo índice e MATCH por linha) custa segundos
+    fts = next(n for n, row in enumerate(details) if 'todos_fts' in row)
+    todos = next(n for n, row in enumerate(details) if 'todos USING' in row)
+    assert fts < todos
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(
+    not os.environ.get('TEST_POSTGRES_URL'),
+    reason='TEST_POSTGRES_URL não configurada',
+)
+@pytest.mark.parametrize('query', _todo_queries().keys())
+async def test_todo_queries_use_index_on_postgres(query):
+    engine = create_async_engine(os.environ['TEST_POSTGRES_URL'])
+    # As tabelas vão para um schema descartável, na mesma transação: nada
+    # do que já existe no banco apontado é criado nem apagado, e uma falha
+    # no meio desfaz o schema junto com o resto
+    schema = f'test_{uuid4().hex}'
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql(f'CREATE SCHEMA {schema}')
+        await conn.exec_driver_sql(f'SET LOCAL search_path TO {schema}')
+        await conn.run_sync(table_registry.metadata.create_all)
+        # tabela vazia: sem isso o planner sempre prefere o seq scan
+        await conn.exec_driver_sql('SET LOCAL enable_seqscan = off')
+        stmt, _ = _todo_queries()[query]
+        sql = _explain_sql(stmt, conn)
+        plan = (await conn.exec_driver_sql(f'EXPLAIN {sql}')).scalars().all()
+        await conn.exec_driver_sql(f'DROP SCHEMA {schema} CASCADE')
+    await engine.dispose()
+
+    plan = '\n'.join(plan)
+    assert 'todos_pkey' in plan or 'ix_todos_user_id' in plan
+    assert 'Seq Scan' not in plan
+
+
+def test_engine_options_split_connections_between_workers(settings):
+    settings = settings.model_copy(
+        update={
+            'DATABASE_URL': 'postgresql+psycopg://app@localhost/app',
+            'WEB_CONCURRENCY': 4,
+            'DB_MAX_CONNECTIONS': 40,
+        }
+    )
+
+    options = engine_options(settings)
+
+    assert options['poolclass'] is TimedQueuePool
+    assert (options['pool_size'], options['max_overflow']) == (5, 5)
+
+
+def test_engine_options_explicit_pool_size(settings):
+    settings = settings.model_copy(
+        update={
+            'DATABASE_URL': 'postgresql+psycopg://app@localhost/app',
+            'DB_POOL_SIZE': 3,
+            'DB_MAX_OVERFLOW': 0,
+        }
+    )
+
+    options = engine_options(settings)
+
+    assert (options['pool_size'], options['max_overflow']) == (3, 0)
+
+
+def test_engine_options_psycopg_prepare_threshold(settings, tmp_path):
+    settings = settings.model_copy(
+        update={
+            'DATABASE_URL': 'postgresql+psycopg://app@localhost/app',
+            'DB_PREPARE_THRESHOLD': 0,
+        }
+    )
+
+    options = engine_options(settings)
+    sqlite_options = engine_options(
+        settings, f'sqlite+aiosqlite:///{tmp_path}/app.db'
+    )
+
+    assert options['connect_args'] == {'prepare_threshold': 0}
+    assert 'connect_args' not in sqlite_options
+
+
+@pytest.mark.asyncio
+async def test_hot_statements_bind_parameters_per_call(
+    session: AsyncSession, user, other_user
+):
+    session.add(
+        Todo(title='t', description='d', state='todo', user_id=user.id)
+    )
+    await session.commit()
+
+    principals = [
+        (await session.execute(PRINCIPAL_BY_EMAIL, {'email': email})).one()
+        for email in (user.email, other_user.email)
+    ]
+    owned = await session.scalar(
+        OWNED_TODO, {'user_id': user.id, 'todo_id': 1}
+    )
+    not_owned = await session.scalar(
+        OWNED_TODO, {'user_id': other_user.id, 'todo_id': 1}
+    )
+
+    assert [row.id for row in principals] == [user.id, other_user.id]
+    assert owned.user_id == user.id
+    assert not_owned is None
+
+
+@pytest.mark.asyncio
+async def test_pool_status_reports_checkouts(settings, tmp_path):
+    settings = settings.model_copy(
+        update={'DATABASE_URL': f'sqlite+aiosqlite:///{tmp_path}/pool.db'}
+    )
+    engine = create_async_engine(
+        settings.DATABASE_URL, **engine_options(settings)
+    )
+
+    async with engine.connect():
+        status = pool_status(engine)
+    returned = pool_status(engine)
+    await engine.dispose()
+
+    assert status['checked_out'] == 1
+    assert status['wait_count'] == 1
+    assert status['wait_seconds_max'] >= 0
+    assert returned['hold_count'] == 1
+    assert returned['hold_seconds_max'] > 0
+
+
+@pytest.mark.parametrize(
+    ('route_class', 'checked_out'), [(APIRoute, 1), (SessionRoute, 0)]
+)
+def test_session_route_releases_connection_before_serializing(
+    tmp_path, route_class, checked_out
+):
+    engine = create_async_engine(
+        f'sqlite+aiosqlite:///{tmp_path}/route.db', poolclass=TimedQueuePool
+    )
+
+    class Occupancy(BaseModel):
+        checked_out: int
+
+        @field_validator('checked_out', mode='before')
+        @classmethod
+        def measure(cls, value):
+            return engine.pool.checkedout()
+
+    async def session_dependency():
+        async with AsyncSession(engine) as session:
+            track_session(session)
+            yield session
+
+    router = APIRouter(route_class=route_class)
+
+    @router.get('/', response_model=Occupancy)
+    async def endpoint(
+        session: Annotated[AsyncSession, Depends(session_dependency)],
+    ):
+        await session.execute(select(1))
+        return {'checked_out': -1}
+
+    app = FastAPI()
+    app.include_router(router)
+    with TestClient(app) as client:
+        response = client.get('/')
+
+    assert response.json() == {'checked_out': checked_out}
+
+
+def _request(token: str | None = None) -> Request:
+    headers = [(b'authorization', f'Bearer {token}'.encode())] if token else []
+    return Request({'type': 'http', 'method': 'GET', 'headers': headers})
+
+
+@pytest.fixture
+def replicas(tmp_path):
+    primary, *replicas = [
+        create_async_engine(f'sqlite+aiosqlite:///{tmp_path}/{name}.db')
+        for name in ('primary', 'replica0', 'replica1')
+    ]
+    return ReplicaSet(primary, replicas, cooldown=60, sticky_seconds=5)
+
+
+def test_replica_set_round_robin_skips_replicas_down(replicas):
+    first, second = replicas.replicas
+
+    assert [replicas.choose() for _ in range(3)] == [first, second, first]
+    replicas.mark_down(first)
+    assert {replicas.choose() for _ in range(3)} == {second}
+    replicas.mark_down(second)
+    assert replicas.choose() is replicas.primary
+
+
+@pytest.mark.asyncio
+async def test_replica_set_health_check(replicas, tmp_path):
+    broken = create_async_engine(
+        f'sqlite+aiosqlite:///{tmp_path}/missing/dir/replica.db'
+    )
+    replicas = ReplicaSet(
+        replicas.primary, [broken], cooldown=60, sticky_seconds=5
+    )
+
+    # erro de conexão numa consulta já tira a réplica da rotação
+    with pytest.raises(OperationalError):
+        async with broken.connect():
+            pass
+    assert not replicas.is_up(broken)
+    assert replicas.choose() is replicas.primary
+
+    (tmp_path / 'missing' / 'dir').mkdir(parents=True)
+    await replicas.check()
+    await broken.dispose()
+
+    assert replicas.choose() is broken
+
+
+@pytest.mark.asyncio
+async def test_replica_set_reads_own_writes_from_primary(replicas):
+    writer, other = _request('writer'), _request('other')
+
+    await replicas.wrote(writer)
+
+    assert await replicas.engine_for(writer) is replicas.primary
+    assert await replicas.engine_for(other) in replicas.replicas
+    assert await replicas.engine_for(_request()) in replicas.replicas
+
+
+@pytest.mark.asyncio
+async def test_lagging_replica_page_comes_from_primary(replicas, monkeypatch):
+    primary, replica = replicas.primary, replicas.replicas[0]
+    for engine, todos_version in ((primary, 1), (replica, 0)):
+        async with engine.begin() as conn:
+            await conn.run_sync(table_registry.metadata.create_all)
+            await conn.execute(
+                User.__table__.insert().values(
+                    username='u',
+                    email='u@u.com',
+                    password='x',
+                    todos_version=todos_version,
+                )
+            )
+    async with primary.begin() as conn:
+        await conn.execute(
+            Todo.__table__.insert().values(
+                title='t', description='d', state=TodoState.todo, user_id=1
+            )
+        )
+    monkeypatch.setattr(todos_router, 'replica_set', replicas)
+
+    async with AsyncSession(replica) as session:
+        page = await todos_router._todos_page_at(
+            session, 1, FilterTodo(include_total=True), version=1
+        )
+        stale = await todos_router._todos_page_at(
+            session, 1, FilterTodo(include_total=True), version=0
+        )
+    for engine in (primary, *replicas.replicas):
+        await engine.dispose()
+
+    assert page['total'] == 1
+    assert stale['total'] == 0
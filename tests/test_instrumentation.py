@@ -0,0 +1,86 @@
+from http import HTTPStatus
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from fastapi_zero.instrumentation import (
+    QueryStatsMiddleware,
+    observe_requests,
+    query_metrics,
+)
+
+
+def test_debug_headers_report_statements(session):
+    app = FastAPI()
+
+    @app.get('/ping/{n}')
+    async def ping(n: int):
+        for _ in range(n):
+            await session.scalar(select(1))
+        return {}
+
+    with TestClient(QueryStatsMiddleware(app, debug=True)) as client:
+        response = client.get('/ping/3')
+
+    expected_queries = 3
+    assert response.status_code == HTTPStatus.OK
+    assert int(response.headers['x-db-query-count']) == expected_queries
+    assert float(response.headers['x-db-time-ms']) >= 0
+    assert 'x-db-slowest-ms' in response.headers
+
+
+def test_no_debug_headers_by_default(client):
+    response = client.get('/users/')
+
+    assert 'x-db-query-count' not in response.headers
+
+
+def test_query_metrics_aggregated_by_route_template(client, user, token):
+    query_metrics.clear()
+
+    with observe_requests() as requests:
+        client.get(
+            f'/users/{user.id}/', headers={'Authorization': f'Bearer {token}'}
+        )
+
+    [(method, route, stats)] = requests
+    assert (method, route) == ('GET', '/users/{user_id}/')
+    assert stats.count == 1
+    assert stats.slowest_statement.startswith('SELECT')
+    assert query_metrics.routes[method, route].requests == 1
+    assert query_metrics.routes[method, route].statements == 1
+
+
+@pytest.mark.parametrize(
+    ('endpoint', 'budget'),
+    [
+        ('GET /users/', 1),
+        ('GET /users/1/', 1),
+        ('GET /todos/', 2),
+        ('GET /todos/?title=compras', 2),
+        ('POST /todos/', 2),
+        ('PATCH /todos/1', 3),
+        ('DELETE /todos/1', 4),
+        ('DELETE /users/1', 4),
+    ],
+)
+def test_endpoint_query_budget(client, token, query_budget, endpoint, budget):
+    headers = {'Authorization': f'Bearer {token}'}
+    todo = {'title': 'compras', 'description': 'mercado', 'state': 'todo'}
+    client.post('/todos/', headers=headers, json=todo)
+    method, path = endpoint.split()
+
+    with query_budget(budget):
+        response = client.request(method, path, headers=headers, json=todo)
+
+    assert response.status_code < HTTPStatus.BAD_REQUEST
+
+
+def test_unmatched_paths_share_one_route_label(client):
+    with observe_requests() as requests:
+        client.get('/nao-existe/1')
+        client.get('/nao-existe/2')
+
+    assert {route for _, route, _ in requests} == {'unmatched'}
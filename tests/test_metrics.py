@@ -0,0 +1,76 @@
+import asyncio
+from http import HTTPStatus
+
+import pytest
+
+from fastapi_zero.metrics import (
+    Histogram,
+    event_loop_lag,
+    monitor_event_loop_lag,
+)
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram('latency_seconds', 'Latência.', buckets=(0.1, 1.0))
+
+    histogram.observe(0.05, route='/a')
+    histogram.observe(0.5, route='/a')
+    histogram.observe(5, route='/a')
+
+    assert list(histogram.samples()) == [
+        'latency_seconds_bucket{route="/a",le="0.1"} 1',
+        'latency_seconds_bucket{route="/a",le="1.0"} 2',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 3',
+        'latency_seconds_sum{route="/a"} 5.55',
+        'latency_seconds_count{route="/a"} 3',
+    ]
+
+
+def test_metrics_endpoint(client):
+    client.get('/healthcheck/')
+    client.get('/users/')
+    client.get('/users/1/')
+
+    response = client.get('/metrics')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/plain')
+    body = response.text
+    assert '# TYPE http_request_duration_seconds histogram' in body
+    assert (
+        'http_requests_total{method="GET",route="/healthcheck/",status="200"}'
+        in body
+    )
+    assert (
+        'http_request_duration_seconds_count'
+        '{method="GET",route="/users/"}' in body
+    )
+    assert 'db_statements_total{method="GET",route="/users/"}' in body
+    assert 'http_requests_in_flight{method="GET"} 1' in body
+    assert 'db_pool_checked_out' in body
+    assert 'event_loop_lag_seconds' in body
+    assert 'read_coalescing_ratio{kind="user"}' in body
+    assert '# TYPE read_coalescing_calls_total counter' in body
+    assert '# TYPE db_pool_checked_out gauge' in body
+    assert '# TYPE cache_lookups_total counter' in body
+    assert 'token_cache_lookups_total{result="hit"}' in body
+
+
+@pytest.mark.asyncio
+async def test_monitor_event_loop_lag_reports_blocked_loop():
+    interval = 0.01
+    blocked = 0.05
+    event_loop_lag.values.clear()
+    task = asyncio.create_task(monitor_event_loop_lag(interval))
+    await asyncio.sleep(0)
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    while loop.time() - start < blocked:
+        pass  # bloqueia o loop de propósito
+    while not event_loop_lag.values:
+        await asyncio.sleep(0)
+    task.cancel()
+
+    [lag] = event_loop_lag.values.values()
+    assert lag >= blocked - interval
@@ -0,0 +1,67 @@
+from http import HTTPStatus
+from types import SimpleNamespace
+
+import pytest
+
+from fastapi_zero import responses
+from fastapi_zero.models import TodoState
+from fastapi_zero.schemas import TodoPublic
+from tests.test_todos import TodoFactory
+
+
+@pytest.fixture
+def fast_json(monkeypatch):
+    monkeypatch.setattr(responses.settings, 'FAST_JSON_RESPONSES', True)
+
+
+@pytest.mark.parametrize('encoder', ['orjson', 'json'])
+def test_dumps_is_compact_and_keeps_unicode(monkeypatch, encoder):
+    if encoder == 'json':
+        monkeypatch.setattr(responses, 'orjson', None)
+
+    body = responses.dumps({'title': 'Descrição', 'state': TodoState.done})
+
+    assert body == '{"title":"Descrição","state":"done"}'.encode()
+
+
+def test_public_dicts_copies_only_public_fields():
+    todo = SimpleNamespace(
+        id=1, title='a', description='b', state='todo', user_id=2
+    )
+
+    assert responses.public_dicts([todo], TodoPublic) == [
+        {'title': 'a', 'description': 'b', 'state': 'todo', 'id': 1}
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('fast_json')
+async def test_list_todos_fast_path_matches_schema(
+    session, client, user, token
+):
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    await session.commit()
+
+    response = client.get(
+        '/todos/?limit=2', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    body = response.json()
+    assert [TodoPublic.model_validate(todo) for todo in body['todos']]
+    assert set(body['todos'][0]) == set(TodoPublic.model_fields)
+    assert body['next_cursor']
+
+
+@pytest.mark.usefixtures('fast_json')
+def test_read_users_fast_path_matches_schema(client, user, token):
+    response = client.get(
+        '/users/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'users': [{'username': user.username, 'email': user.email, 'id': 1}],
+        'next_cursor': None,
+        'total': None,
+    }
@@ -1,10 +1,18 @@
 from datetime import datetime, timedelta
 from http import HTTPStatus
 
+import pytest
 from jwt import decode, encode
 
+from fastapi_zero import security
 from fastapi_zero.security import (
     create_access_token,
+    get_current_user,
+    get_password_hash_async,
+    hashing_pool,
+    invalidate_user_tokens,
+    principal_cache,
+    verify_password_async,
 )
 
 
@@ -59,3 +67,95 @@ def test_get_current_user_token_invalid_email(client, settings):
     print(response.status_code)
     assert response.status_code == HTTPStatus.UNAUTHORIZED
     assert response.json() == {'detail': 'Could not validate credentials'}
+
+
+@pytest.mark.asyncio
+async def test_password_hash_async_roundtrip():
+    hashed = await get_password_hash_async('senha-secreta')
+
+    assert await verify_password_async('senha-secreta', hashed)
+    assert not await verify_password_async('senha-errada', hashed)
+    assert hashing_pool.pending == 0
+
+
+def test_login_too_many_requests_when_hashing_pool_is_full(
+    client, user, monkeypatch
+):
+    monkeypatch.setattr(hashing_pool, 'max_pending', 0)
+
+    response = client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': user.clean_password},
+    )
+
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert response.headers['retry-after'] == '1'
+
+
+def test_get_current_user_uses_token_cache(client, token, count_queries):
+    expected_queries = 1  # apenas a listagem de usuários
+    client.get('/users/', headers={'Authorization': f'Bearer {token}'})
+    hits = principal_cache.hits
+
+    with count_queries() as statements:
+        response = client.get(
+            '/users/', headers={'Authorization': f'Bearer {token}'}
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert principal_cache.hits == hits + 1
+    assert len(statements) == expected_queries
+
+
+def test_token_cache_invalidated_on_user_update(client, user, token):
+    client.get('/users/', headers={'Authorization': f'Bearer {token}'})
+
+    client.put(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'username': 'novo-nome',
+            'email': 'novo-email@example.com',
+            'password': 'nova-senha',
+        },
+    )
+    response = client.get(
+        '/users/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_token_cache_invalidated_on_user_delete(client, user, token):
+    client.get('/users/', headers={'Authorization': f'Bearer {token}'})
+
+    client.delete(
+        f'/users/{user.id}', headers={'Authorization': f'Bearer {token}'}
+    )
+    response = client.get(
+        '/users/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert len(principal_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_lookup_finishing_after_invalidation_is_not_cached(
+    session, user, monkeypatch
+):
+    load_principal = security._load_principal
+
+    async def load_then_invalidate(session, email):
+        row = await load_principal(session, email)
+        # update/delete do usuário commitou com a consulta em andamento
+        invalidate_user_tokens(user.id)
+        return row
+
+    monkeypatch.setattr(security, '_load_principal', load_then_invalidate)
+    token = create_access_token({'sub': user.email})
+
+    principal = await get_current_user(session=session, token=token)
+
+    assert principal.id == user.id
+    assert principal_cache.get(token) is None
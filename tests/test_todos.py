@@ -1,10 +1,15 @@
+import csv
+import io
 from http import HTTPStatus
 
 import factory
 import factory.fuzzy
 import pytest
+from sqlalchemy import select
 
 from fastapi_zero.models import Todo, TodoState
+from fastapi_zero.routers import todos as todos_router
+from fastapi_zero.schemas import TodoPublic
 
 
 class TodoFactory(factory.Factory):
@@ -215,3 +220,721 @@ async def test_patch_todo(client, token, user, session):
     )
     assert response.status_code == HTTPStatus.OK
     assert response.json()['title'] == 'teste!'
+
+
+@pytest.mark.asyncio
+async def test_delete_todo_does_not_load_user_todos(
+    client, session, token, user, count_queries
+):
+    # usuário autenticado, busca do todo, o todos_version, o DELETE e o
+    # tombstone
+    expected_queries = 5
+    session.add_all(TodoFactory.create_batch(20, user_id=user.id))
+    await session.commit()
+
+    with count_queries() as statements:
+        response = client.delete(
+            '/todos/1', headers={'Authorization': f'Bearer {token}'}
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert len(statements) == expected_queries
+
+
+@pytest.mark.asyncio
+async def test_list_todos_query_count(
+    client, session, token, user, count_queries
+):
+    # usuário autenticado, todos_version (ETag) e a página
+    expected_queries = 3
+    session.add_all(TodoFactory.create_batch(5, user_id=user.id))
+    await session.commit()
+
+    with count_queries() as statements:
+        response = client.get(
+            '/todos/', headers={'Authorization': f'Bearer {token}'}
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert len(statements) == expected_queries
+
+
+@pytest.mark.asyncio
+async def test_list_todos_cursor_pagination(session, client, user, token):
+    session.add_all(TodoFactory.create_batch(5, user_id=user.id))
+    await session.commit()
+
+    ids = []
+    cursor = ''
+    while cursor is not None:
+        response = client.get(
+            f'/todos/?limit=2&cursor={cursor}',
+            headers={'Authorization': f'Bearer {token}'},
+        )
+        ids += [todo['id'] for todo in response.json()['todos']]
+        cursor = response.json()['next_cursor']
+
+    assert ids == [1, 2, 3, 4, 5]
+
+
+def test_list_todos_invalid_cursor(client, token):
+    response = client.get(
+        '/todos/?cursor=nao-e-um-cursor',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Invalid cursor'}
+
+
+@pytest.mark.asyncio
+async def test_list_todos_total_counts_every_filtered_todo(
+    session, client, user, token, count_queries
+):
+    total, limit = 5, 2
+    session.add_all(
+        TodoFactory.create_batch(total, user_id=user.id, state=TodoState.todo)
+        + TodoFactory.create_batch(3, user_id=user.id, state=TodoState.done)
+    )
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    with count_queries() as statements:
+        page = client.get(
+            f'/todos/?state=todo&limit={limit}&include_total=true',
+            headers=headers,
+        ).json()
+    without_total = client.get(
+        f'/todos/?state=todo&limit={limit}', headers=headers
+    ).json()
+
+    assert len(page['todos']) == limit
+    assert page['total'] == total
+    # COUNT à parte; a consulta da página continua parando no LIMIT
+    assert 'OVER' not in statements[-2]
+    assert statements[-1].startswith('SELECT count(*)')
+    assert without_total['total'] is None
+
+
+@pytest.mark.parametrize(('offset', 'total'), [(0, 0), (10, 2)])
+def test_list_todos_total_on_empty_page(client, token, offset, total):
+    headers = {'Authorization': f'Bearer {token}'}
+    if total:
+        client.post(
+            '/todos/bulk',
+            headers=headers,
+            json=[
+                {'title': f'todo {n}', 'description': 'd', 'state': 'todo'}
+                for n in range(total)
+            ],
+        )
+
+    response = client.get(
+        f'/todos/?offset={offset}&include_total=true', headers=headers
+    )
+
+    assert response.json()['todos'] == []
+    assert response.json()['total'] == total
+
+
+@pytest.mark.asyncio
+async def test_list_todos_search_ranked_by_relevance(
+    session, client, user, token
+):
+    # corpus maior que o número de resultados para o bm25 ter idf positivo
+    session.add_all(
+        TodoFactory.create_batch(
+            10, user_id=user.id, title='tarefa sem relação', description='-'
+        )
+    )
+    session.add_all([
+        TodoFactory.create(
+            user_id=user.id, title='comprar pão e leite hoje', description='-'
+        ),
+        TodoFactory.create(user_id=user.id, title='leite', description='-'),
+    ])
+    await session.commit()
+
+    response = client.get(
+        '/todos/?title=leit', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert [todo['title'] for todo in response.json()['todos']] == [
+        'leite',
+        'comprar pão e leite hoje',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_list_todos_search_pages_return_each_match_once(
+    session, client, user, token
+):
+    matching, limit = 30, 4
+    session.add_all(
+        TodoFactory.create_batch(
+            10, user_id=user.id, title='tarefa sem relação', description='-'
+        )
+    )
+    # títulos de tamanhos diferentes: a relevância não segue a ordem do id
+    session.add_all([
+        TodoFactory.create(
+            user_id=user.id,
+            title=' '.join(['leite'] + ['outra'] * (n * 7 % matching)),
+            description='-',
+        )
+        for n in range(matching)
+    ])
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    seen, cursor = [], ''
+    while cursor is not None:
+        page = client.get(
+            f'/todos/?title=leite&limit={limit}&cursor={cursor}',
+            headers=headers,
+        ).json()
+        seen += [todo['id'] for todo in page['todos']]
+        cursor = page['next_cursor']
+    assert len(seen) == len(set(seen))
+
+    # a busca ordenada por relevância pagina por offset
+    seen, offset = [], 0
+    while todos := client.get(
+        f'/todos/?title=leite&limit={limit}&offset={offset}',
+        headers=headers,
+    ).json()['todos']:
+        seen += [todo['id'] for todo in todos]
+        offset += limit
+    assert len(seen) == len(set(seen)) == matching
+
+
+@pytest.mark.asyncio
+async def test_list_todos_search_index_follows_updates(
+    session, client, user, token
+):
+    todo = TodoFactory.create(user_id=user.id, title='titulo antigo')
+    session.add(todo)
+    await session.commit()
+
+    client.patch(
+        f'/todos/{todo.id}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'title': 'titulo novo'},
+    )
+    old = client.get(
+        '/todos/?title=antigo', headers={'Authorization': f'Bearer {token}'}
+    )
+    new = client.get(
+        '/todos/?title=novo', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert old.json()['todos'] == []
+    assert [todo['title'] for todo in new.json()['todos']] == ['titulo novo']
+
+
+def test_create_todos_bulk(client, token, count_queries):
+    payload = [
+        {'title': f'todo {n}', 'description': 'em lote', 'state': 'todo'}
+        for n in range(3)
+    ]
+    # usuário autenticado, o todos_version e o INSERT ... RETURNING. O
+    # SQLite não garante a ordem do RETURNING, então o SQLAlchemy faz um
+    # INSERT por item para seguir a ordem do payload (no PostgreSQL é um
+    # INSERT só)
+    expected_queries = 2 + len(payload)
+
+    with count_queries() as statements:
+        response = client.post(
+            '/todos/bulk',
+            headers={'Authorization': f'Bearer {token}'},
+            json=payload,
+        )
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert response.json()['results'] == [
+        {
+            'id': n + 1,
+            'status': HTTPStatus.CREATED,
+            'todo': {**item, 'id': n + 1},
+        }
+        for n, item in enumerate(payload)
+    ]
+    assert len(statements) == expected_queries
+
+
+def test_create_todos_bulk_rejects_empty_list(client, token):
+    response = client.post(
+        '/todos/bulk', headers={'Authorization': f'Bearer {token}'}, json=[]
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_update_todos_bulk(client, session, token, user, other_user):
+    session.add_all(TodoFactory.create_batch(2, user_id=user.id))
+    session.add(TodoFactory.create(user_id=other_user.id))
+    await session.commit()
+
+    response = client.patch(
+        '/todos/bulk',
+        headers={'Authorization': f'Bearer {token}'},
+        json=[
+            {'id': 1, 'title': 'novo 1'},
+            {'id': 2, 'state': 'done'},
+            {'id': 3, 'title': 'de outro usuário'},
+        ],
+    )
+    results = response.json()['results']
+
+    assert response.status_code == HTTPStatus.OK
+    assert [r['status'] for r in results] == [
+        HTTPStatus.OK,
+        HTTPStatus.OK,
+        HTTPStatus.NOT_FOUND,
+    ]
+    assert results[0]['todo']['title'] == 'novo 1'
+    assert results[1]['todo']['state'] == 'done'
+    assert results[2]['todo'] is None
+
+
+@pytest.mark.asyncio
+async def test_update_todos_bulk_query_count_does_not_grow(
+    client, session, token, user, count_queries
+):
+    todos = 50
+    session.add_all(TodoFactory.create_batch(todos, user_id=user.id))
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    def patch(ids):
+        # todos os campos, em três combinações diferentes
+        payload = [
+            {'id': n, 'state': 'done'}
+            if n % 3 == 0
+            else {'id': n, 'title': f'novo {n}'}
+            if n % 3 == 1
+            else {'id': n, 'title': f'novo {n}', 'description': 'em lote'}
+            for n in ids
+        ]
+        with count_queries() as statements:
+            response = client.patch(
+                '/todos/bulk', headers=headers, json=payload
+            )
+        assert response.status_code == HTTPStatus.OK
+        return len(statements), response.json()['results']
+
+    # todos_version, um UPDATE por combinação de campos e o SELECT final
+    expected_queries = 5
+    client.get('/todos/', headers=headers)  # principal já em cache
+    few, _ = patch(range(1, 6))
+    many, results = patch(range(1, todos + 1))
+
+    assert few == many == expected_queries
+    first, second, third = (result['todo'] for result in results[:3])
+    assert first['title'] == 'novo 1'
+    assert (second['title'], second['description']) == ('novo 2', 'em lote')
+    assert third['state'] == 'done'
+
+
+def test_update_todos_bulk_without_changes_keeps_version(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    todo = client.post(
+        '/todos/',
+        headers=headers,
+        json={'title': 'igual', 'description': 'igual', 'state': 'todo'},
+    ).json()
+    etag = client.get('/todos/', headers=headers).headers['etag']
+
+    response = client.patch(
+        '/todos/bulk',
+        headers=headers,
+        json=[{'id': todo['id'], 'title': 'igual'}, {'id': 42, 'title': 'x'}],
+    )
+
+    assert [r['status'] for r in response.json()['results']] == [
+        HTTPStatus.OK,
+        HTTPStatus.NOT_FOUND,
+    ]
+    assert client.get('/todos/', headers=headers).headers['etag'] == etag
+
+
+@pytest.mark.asyncio
+async def test_delete_todos_bulk(client, session, token, user, other_user):
+    session.add_all(TodoFactory.create_batch(2, user_id=user.id))
+    session.add(TodoFactory.create(user_id=other_user.id))
+    await session.commit()
+
+    response = client.request(
+        'DELETE',
+        '/todos/bulk',
+        headers={'Authorization': f'Bearer {token}'},
+        json=[1, 2, 3, 42],
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['results'] == [
+        {'id': 1, 'status': HTTPStatus.OK, 'todo': None},
+        {'id': 2, 'status': HTTPStatus.OK, 'todo': None},
+        {'id': 3, 'status': HTTPStatus.NOT_FOUND, 'todo': None},
+        {'id': 42, 'status': HTTPStatus.NOT_FOUND, 'todo': None},
+    ]
+
+
+def test_delete_todos_bulk_without_matches_keeps_version(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    etag = client.get('/todos/', headers=headers).headers['etag']
+
+    response = client.request(
+        'DELETE', '/todos/bulk', headers=headers, json=[42]
+    )
+
+    assert response.json()['results'] == [
+        {'id': 42, 'status': HTTPStatus.NOT_FOUND, 'todo': None}
+    ]
+    assert client.get('/todos/', headers=headers).headers['etag'] == etag
+
+
+def test_create_todo_query_count(client, token, count_queries):
+    # usuário autenticado, o INSERT ... RETURNING (sem refresh) e o
+    # todos_version
+    expected_queries = 3
+
+    with count_queries() as statements:
+        response = client.post(
+            '/todos/',
+            headers={'Authorization': f'Bearer {token}'},
+            json={'title': 'titulo', 'description': 'descricao'},
+        )
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert len(statements) == expected_queries
+    assert 'RETURNING' in statements[1]
+
+
+@pytest.mark.asyncio
+async def test_update_todo_query_count(
+    client, session, token, user, count_queries
+):
+    # usuário autenticado, busca do todo, o UPDATE ... RETURNING e o
+    # todos_version
+    expected_queries = 4
+    session.add(TodoFactory.create(user_id=user.id))
+    await session.commit()
+
+    with count_queries() as statements:
+        response = client.patch(
+            '/todos/1',
+            headers={'Authorization': f'Bearer {token}'},
+            json={'title': 'novo'},
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert len(statements) == expected_queries
+    assert 'RETURNING' in statements[2]
+
+
+def test_list_todos_selects_only_public_columns(client, token, count_queries):
+    with count_queries() as statements:
+        client.get('/todos/', headers={'Authorization': f'Bearer {token}'})
+
+    statement = statements[-1]
+    assert 'todos.created_at' not in statement
+    assert 'todos.user_id,' not in statement
+
+
+@pytest.mark.asyncio
+async def test_export_todos_ndjson_has_no_page_cap(
+    session, client, user, other_user, token
+):
+    expected_todos = 25
+    session.add_all(TodoFactory.create_batch(expected_todos, user_id=user.id))
+    session.add_all(TodoFactory.create_batch(3, user_id=other_user.id))
+    await session.commit()
+
+    response = client.get(
+        '/todos/export', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    lines = response.text.splitlines()
+    todos = [TodoPublic.model_validate_json(line) for line in lines]
+    assert len(todos) == expected_todos
+    assert [todo.id for todo in todos] == sorted(todo.id for todo in todos)
+
+
+@pytest.mark.asyncio
+async def test_export_todos_csv_honours_filters(session, client, user, token):
+    session.add_all([
+        TodoFactory(title='Comprar leite', state='done', user_id=user.id),
+        TodoFactory(title='Comprar pão', state='todo', user_id=user.id),
+        TodoFactory(title='Estudar', state='done', user_id=user.id),
+    ])
+    await session.commit()
+
+    response = client.get(
+        '/todos/export?format=csv&title=comprar&state=done',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/csv')
+    assert 'todos.csv' in response.headers['content-disposition']
+    header, *rows = list(csv.reader(io.StringIO(response.text)))
+    assert header == ['title', 'description', 'state', 'id']
+    assert [(row[0], row[2]) for row in rows] == [('Comprar leite', 'done')]
+
+
+@pytest.mark.asyncio
+async def test_export_streams_in_chunks(session, user, monkeypatch):
+    monkeypatch.setattr(todos_router, 'EXPORT_CHUNK_SIZE', 2)
+    session.add_all(TodoFactory.create_batch(5, user_id=user.id))
+    await session.commit()
+    query = select(Todo.title, Todo.description, Todo.state, Todo.id)
+
+    chunks = [
+        chunk
+        async for chunk in todos_router._export_rows(
+            session.bind, query, 'ndjson'
+        )
+    ]
+
+    expected_chunks = 3
+    assert len(chunks) == expected_chunks
+    assert [chunk.count(b'\n') for chunk in chunks] == [2, 2, 1]
+
+
+@pytest.mark.asyncio
+async def test_list_todos_not_modified_skips_list_query(
+    session, client, user, token, count_queries
+):
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+    etag = client.get('/todos/', headers=headers).headers['etag']
+
+    with count_queries() as statements:
+        response = client.get(
+            '/todos/', headers={**headers, 'If-None-Match': etag}
+        )
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers['etag'] == etag
+    assert not response.content
+    assert len(statements) == 1
+    assert 'todos_version' in statements[0]
+
+
+@pytest.mark.parametrize(
+    ('method', 'path', 'body'),
+    [
+        ('POST', '/todos/', {'title': 'novo', 'description': 'novo'}),
+        ('PATCH', '/todos/1', {'title': 'outro'}),
+        ('DELETE', '/todos/1', None),
+        ('POST', '/todos/bulk', [{'title': 'a', 'description': 'b'}]),
+        ('PATCH', '/todos/bulk', [{'id': 1, 'state': 'trash'}]),
+        ('DELETE', '/todos/bulk', [1]),
+    ],
+)
+def test_todo_writes_change_list_etag(client, token, method, path, body):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post(
+        '/todos/', headers=headers, json={'title': 'a', 'description': 'b'}
+    )
+    etag = client.get('/todos/', headers=headers).headers['etag']
+
+    client.request(method, path, headers=headers, json=body)
+    response = client.get(
+        '/todos/', headers={**headers, 'If-None-Match': etag}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['etag'] != etag
+
+
+def test_list_todos_etag_depends_on_filters(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    first = client.get('/todos/?limit=5', headers=headers)
+    second = client.get('/todos/?limit=6', headers=headers)
+
+    assert first.headers['etag'].startswith('W/"')
+    assert first.headers['etag'] != second.headers['etag']
+
+
+def test_update_todo_without_changes_keeps_etag(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post(
+        '/todos/', headers=headers, json={'title': 'a', 'description': 'b'}
+    )
+    etag = client.get('/todos/', headers=headers).headers['etag']
+
+    client.patch('/todos/1', headers=headers, json={'title': 'a'})
+    response = client.get(
+        '/todos/', headers={**headers, 'If-None-Match': etag}
+    )
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def _sync(client, token, since=None, limit=100):
+    params = {'limit': limit, **({'since': since} if since else {})}
+    response = client.get(
+        '/todos/changes',
+        params=params,
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    assert response.status_code == HTTPStatus.OK
+    return response.json()
+
+
+def test_todo_changes_since_cursor(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    for n in range(3):
+        client.post(
+            '/todos/',
+            headers=headers,
+            json={'title': f'todo {n}', 'description': 'sync'},
+        )
+    first = _sync(client, token)
+
+    client.patch('/todos/2', headers=headers, json={'state': 'done'})
+    client.delete('/todos/1', headers=headers)
+    client.post(
+        '/todos/', headers=headers, json={'title': 'novo', 'description': 'x'}
+    )
+    changes = _sync(client, token, first['next_cursor'])
+
+    assert [todo['id'] for todo in first['todos']] == [1, 2, 3]
+    assert first['deleted'] == []
+    assert [(t['id'], t['state']) for t in changes['todos']] == [
+        (2, 'done'),
+        (4, 'todo'),
+    ]
+    assert changes['deleted'] == [1]
+    assert changes['has_more'] is False
+    assert _sync(client, token, changes['next_cursor']) == {
+        'todos': [],
+        'deleted': [],
+        'next_cursor': changes['next_cursor'],
+        'has_more': False,
+    }
+
+
+def test_todo_changes_pages_through_bulk_writes(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post(
+        '/todos/bulk',
+        headers=headers,
+        json=[{'title': f'todo {n}', 'description': 'x'} for n in range(5)],
+    )
+    client.request('DELETE', '/todos/bulk', headers=headers, json=[1, 2])
+
+    seen, deleted, cursor, pages = [], [], None, 0
+    while True:
+        page = _sync(client, token, cursor, limit=2)
+        seen += [todo['id'] for todo in page['todos']]
+        deleted += page['deleted']
+        cursor, pages = page['next_cursor'], pages + 1
+        if not page['has_more']:
+            break
+
+    expected_pages = 3
+    assert seen == [3, 4, 5]
+    assert deleted == [1, 2]
+    assert pages == expected_pages
+
+
+@pytest.mark.asyncio
+async def test_todo_changes_query_count_ignores_list_size(
+    session, client, user, token, count_queries
+):
+    session.add_all(TodoFactory.create_batch(50, user_id=user.id))
+    await session.commit()
+    cursor = _sync(client, token)['next_cursor']
+
+    with count_queries() as statements:
+        changes = _sync(client, token, cursor)
+
+    # todos alterados e tombstones, com o usuário já em cache
+    expected_queries = 2
+    assert changes['todos'] == []
+    assert len(statements) == expected_queries
+
+
+def test_todo_changes_reused_id_is_not_deleted(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post(
+        '/todos/', headers=headers, json={'title': 'a', 'description': 'b'}
+    )
+    cursor = _sync(client, token)['next_cursor']
+    client.delete('/todos/1', headers=headers)
+    # sem AUTOINCREMENT o SQLite reaproveita o maior id apagado
+    client.post(
+        '/todos/', headers=headers, json={'title': 'c', 'description': 'd'}
+    )
+
+    changes = _sync(client, token, cursor)
+
+    assert [todo['title'] for todo in changes['todos']] == ['c']
+    assert changes['deleted'] == []
+
+
+def test_todo_changes_invalid_cursor(client, token):
+    response = client.get(
+        '/todos/changes?since=id:1',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.asyncio
+async def test_todo_stats(session, client, user, other_user, token):
+    todo, done = 3, 2
+    session.add_all(
+        TodoFactory.create_batch(todo, user_id=user.id, state=TodoState.todo)
+        + TodoFactory.create_batch(done, user_id=user.id, state=TodoState.done)
+        + TodoFactory.create_batch(4, user_id=other_user.id)
+    )
+    await session.commit()
+
+    response = client.get(
+        '/todos/stats', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'total': todo + done,
+        'by_state': {
+            'draft': 0,
+            'todo': todo,
+            'doing': 0,
+            'done': done,
+            'trash': 0,
+        },
+    }
+
+
+def test_todo_stats_not_modified_until_write(client, token, count_queries):
+    headers = {'Authorization': f'Bearer {token}'}
+    etag = client.get('/todos/stats', headers=headers).headers['etag']
+
+    with count_queries() as statements:
+        cached = client.get(
+            '/todos/stats', headers={**headers, 'If-None-Match': etag}
+        )
+    client.post(
+        '/todos/',
+        headers=headers,
+        json={'title': 't', 'description': 'd', 'state': 'todo'},
+    )
+    changed = client.get(
+        '/todos/stats', headers={**headers, 'If-None-Match': etag}
+    )
+
+    assert cached.status_code == HTTPStatus.NOT_MODIFIED
+    assert len(statements) == 1
+    assert changed.status_code == HTTPStatus.OK
+    assert changed.json()['total'] == 1
@@ -1,5 +1,10 @@
 from http import HTTPStatus
+from types import SimpleNamespace
 
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from fastapi_zero.routers.users import conflict_detail
 from fastapi_zero.schemas import UserPublic
 
 
@@ -60,7 +65,37 @@ def test_read_users(client, user, other_user, token):
         '/users/', headers={'Authorization': f'Bearer {token}'}
     )
     assert response.status_code == HTTPStatus.OK
-    assert response.json() == {'users': [user, other_user]}
+    assert response.json() == {
+        'users': [user, other_user],
+        'next_cursor': None,
+        'total': None,
+    }
+
+
+def test_read_users_include_total(client, user, other_user, token):
+    total = 2
+    response = client.get(
+        '/users/?limit=1&include_total=true',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert len(response.json()['users']) == 1
+    assert response.json()['total'] == total
+
+
+def test_read_users_cursor_pagination(client, user, other_user, token):
+    response = client.get(
+        '/users/?limit=1', headers={'Authorization': f'Bearer {token}'}
+    )
+    cursor = response.json()['next_cursor']
+
+    response = client.get(
+        f'/users/?limit=1&cursor={cursor}',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert [u['id'] for u in response.json()['users']] == [other_user.id]
 
 
 def test_read_user_with_id_valid(client, user):
@@ -178,3 +213,118 @@ def test_delete_user_with_id_UNAUTHORIZED(client, other_user, token):
     )
     assert response.status_code == HTTPStatus.FORBIDDEN
     assert response.json() == {'detail': 'Not enough permission!'}
+
+
+def test_update_user_query_count(client, session, user, token, count_queries):
+    # usuário autenticado, carga do User e o UPDATE ... RETURNING
+    expected_queries = 3
+    session.expunge(user)  # como numa sessão nova, sem identity map
+
+    with count_queries() as statements:
+        response = client.put(
+            f'/users/{user.id}',
+            headers={'Authorization': f'Bearer {token}'},
+            json={
+                'username': 'novo',
+                'email': 'novo@example.com',
+                'password': 'nova-senha',
+            },
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert len(statements) == expected_queries
+    assert 'RETURNING' in statements[-1]
+
+
+def test_created_user_query_count(client, count_queries):
+    # só o INSERT ... RETURNING: a unicidade fica com as constraints
+    expected_queries = 1
+
+    with count_queries() as statements:
+        response = client.post(
+            '/users/',
+            json={
+                'username': 'ana',
+                'email': 'ana@example.com',
+                'password': 'senha-da-ana',
+            },
+        )
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert len(statements) == expected_queries
+
+
+class FakePostgresError(Exception):
+    def __init__(self, message: str, constraint_name: str):
+        super().__init__(message)
+        self.diag = SimpleNamespace(constraint_name=constraint_name)
+
+
+def test_conflict_detail_from_postgres_error():
+    # o DETAIL traz o valor duplicado, que pode conter "username"
+    error = IntegrityError(
+        'INSERT INTO users ...',
+        {},
+        FakePostgresError(
+            'duplicate key value violates unique constraint "users_email_key"'
+            '\nDETAIL:  Key (email)=(username@example.com) already exists.',
+            'users_email_key',
+        ),
+    )
+
+    assert conflict_detail(error) == 'Email already exists!'
+
+
+@pytest.mark.parametrize(
+    ('column', 'detail'),
+    [
+        ('username', 'Username already exists!'),
+        ('email', 'Email already exists!'),
+    ],
+)
+def test_conflict_detail_from_sqlite_error(column, detail):
+    error = IntegrityError(
+        'INSERT INTO users ...',
+        {},
+        Exception(f'UNIQUE constraint failed: users.{column}'),
+    )
+
+    assert conflict_detail(error) == detail
+
+
+def test_read_users_selects_only_public_columns(
+    client, user, token, count_queries
+):
+    with count_queries() as statements:
+        client.get('/users/', headers={'Authorization': f'Bearer {token}'})
+
+    statement = statements[-1]
+    assert 'users.password' not in statement
+    assert 'users.username, users.email, users.id' in statement
+
+
+def test_read_user_not_modified(client, user, token):
+    etag = client.get(f'/users/{user.id}/').headers['etag']
+
+    response = client.get(
+        f'/users/{user.id}/', headers={'If-None-Match': f'"x", {etag}'}
+    )
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers['etag'] == etag
+
+    client.put(
+        f'/users/{user.id}/',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'username': 'novo',
+            'email': user.email,
+            'password': user.clean_password,
+        },
+    )
+    response = client.get(
+        f'/users/{user.id}/', headers={'If-None-Match': etag}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['username'] == 'novo'